@@ -2,18 +2,41 @@
 # Imports
 #----------------------------------------------------------------------------#
 
+import functools
+import hashlib
 import json
 import logging
+import threading
+from datetime import datetime, timedelta
 from logging import Formatter, FileHandler
 import dateutil.parser
 import babel
-
-from flask import Flask, render_template, request, flash, redirect, url_for, jsonify
+import babel.dates
+import click
+from concurrent.futures import ThreadPoolExecutor
+try:
+  # optional faster JSON encoder for the API (pip install orjson)
+  import orjson
+except ImportError:
+  orjson = None
+
+from flask import Flask, Response, g, render_template, request, session, flash, redirect, url_for, jsonify, stream_with_context
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from sqlalchemy import text
+from flask.cli import AppGroup
+from werkzeug.http import is_resource_modified
+from sqlalchemy import text, Computed
+from sqlalchemy.dialects.postgresql import ExcludeConstraint, JSONB, TSRANGE
+from sqlalchemy.exc import IntegrityError
 from forms import *
+from cache import PageCache
+from routing import RoutingSQLAlchemy, ReplicaRouter
+from suggest import SuggestionIndex
+from bulk import bulk_cli
+from assets import AssetManifest, assets_cli
+from templating import TemplateProfiler, enable_bytecode_cache, templates_cli
+from seed import seed_command
+from instrumentation import Instrumentation
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -22,33 +45,48 @@ from forms import *
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
-db = SQLAlchemy(app)
+# SQLAlchemy with a session that can send read only views to the replicas (see routing.py)
+db = RoutingSQLAlchemy(app)
 # Note to self. if I move models to a seperate module, use below line and comment line above
 # db.init_app(app)
 migrate = Migrate(app, db)
+cache = PageCache(app)
+replicas = ReplicaRouter(app)
+suggestions = SuggestionIndex()
+instrumentation = Instrumentation(app)
+assets = AssetManifest(app)
+# after Instrumentation, the profiler's template class extends its timed one
+template_profiler = TemplateProfiler(app)
+enable_bytecode_cache(app)
 
 # DONETODO: connect to a local postgresql database
-# Testing my DB-kamalFyyurNatwest connection
-with app.app_context():
-  try:
-    with db.engine.connect() as conn:
-      # checking the version number here
-      result = conn.execute(text("SELECT version()"))
-      version_str = " ".join(result.scalar().split()[:2])
-      # confirming the database name to ensure I am on the right one
-      dbname_result = conn.execute(text("SELECT current_database()"))
-      dbname = dbname_result.scalar()
-
-      print(f"\nYESSSSS! Database connection successful.\nPostgreSQL version: {version_str}\n The Database name: {dbname}\n")
-  except Exception as e:
-    print("Oops... Database connection failed:", e)
+# NOTE: the connection check used to run here at import time, which cost every worker a DB
+# round trip on start up (and hung them when Postgres was slow). It's now on demand:
+# `flask check-db` or GET /health/ready (see database_status below)
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
+# server side default for the updated_at columns, rows COPYed in by bulk / seed get it
+UTC_NOW = db.text("timezone('utc', now())")
+
 class Venue(db.Model):
   __tablename__ = 'Venue'
+  __table_args__ = (
+    # trigram index so the name ilike '%term%' search doesn't sequential scan (needs pg_trgm)
+    db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    # the /venues area listing walks venues in (city, state) order
+    db.Index('ix_Venue_city_state', 'city', 'state'),
+    # the show form's venue picker pages through venues in (name, id) order
+    db.Index('ix_Venue_name_id', 'name', 'id'),
+    # genre filters (genres && / @> ARRAY[...])
+    db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+    # the purge job looks up the (few) soft deleted venues
+    db.Index('ix_Venue_deleted_at', 'deleted_at', postgresql_where=db.text('deleted_at IS NOT NULL')),
+    # max(updated_at) is the Last-Modified / ETag of the pages listing venues
+    db.Index('ix_Venue_updated_at', 'updated_at'),
+  )
 
   id = db.Column(db.Integer, primary_key=True)
   name = db.Column(db.String)
@@ -64,14 +102,36 @@ class Venue(db.Model):
   seeking_description = db.Column(db.String)
   # NOTE: based on research next line should only work with PostgreSQL DB. Other DB should use simple .string
   genres = db.Column(db.ARRAY(db.String), nullable=False)
-  # Relationships
-  shows = db.relationship('Show', back_populates='venue', cascade='all, delete-orphan')
+  # denormalized count of shows with start_time >= now (upcoming, as the detail pages split them),
+  # kept up to date by the show writes and the `flask counters roll` job (see Counters below)
+  num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+  # set by delete_venue: the venue disappears from every page right away and `flask purge`
+  # removes the row and its shows later, in batches
+  deleted_at = db.Column(db.DateTime)
+  # bumped by every ORM / Core UPDATE of the row (edits, counters, soft delete), the pages
+  # showing the row are Last-Modified at the newest one (see Conditional GETs)
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                         server_default=UTC_NOW)
+  # Relationships (passive_deletes: the database cascades the shows, the ORM doesn't load them)
+  shows = db.relationship('Show', back_populates='venue', cascade='all, delete-orphan', passive_deletes=True)
 
   def __repr__(self):
     return f'<Venue {self.id} {self.name}>'
 
 class Artist(db.Model):
   __tablename__ = 'Artist'
+  __table_args__ = (
+    # trigram index so the name ilike '%term%' search doesn't sequential scan (needs pg_trgm)
+    db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    # city / state filters on /artists
+    db.Index('ix_Artist_city_state', 'city', 'state'),
+    # the show form's artist picker pages through artists in (name, id) order
+    db.Index('ix_Artist_name_id', 'name', 'id'),
+    # genre filters (genres && / @> ARRAY[...])
+    db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+    db.Index('ix_Artist_deleted_at', 'deleted_at', postgresql_where=db.text('deleted_at IS NOT NULL')),
+    db.Index('ix_Artist_updated_at', 'updated_at'),
+  )
 
   id = db.Column(db.Integer, primary_key=True)
   name = db.Column(db.String)
@@ -87,8 +147,16 @@ class Artist(db.Model):
   seeking_description = db.Column(db.String)
   # NOTE: based on research next line should only work with PostgreSQL DB. Other DB should use simple .string
   genres = db.Column(db.ARRAY(db.String), nullable=False)
-  # Relationships
-  shows = db.relationship('Show', back_populates='artist', cascade='all, delete-orphan')
+  # denormalized count of shows with start_time >= now (upcoming, as the detail pages split them),
+  # kept up to date by the show writes and the `flask counters roll` job (see Counters below)
+  num_upcoming_shows = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+  # set by delete_artist: the artist disappears from every page right away and `flask purge`
+  # removes the row and its shows later, in batches
+  deleted_at = db.Column(db.DateTime)
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                         server_default=UTC_NOW)
+  # Relationships (passive_deletes: the database cascades the shows, the ORM doesn't load them)
+  shows = db.relationship('Show', back_populates='artist', cascade='all, delete-orphan', passive_deletes=True)
 
   def __repr__(self):
     return f'<Artist {self.id} {self.name}>'
@@ -96,11 +164,28 @@ class Artist(db.Model):
 # DONETODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 class Show(db.Model):
   __tablename__ = 'Show'
+  __table_args__ = (
+    # every hot query filters on one side of the show plus start_time
+    db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    # the /shows listing is keyset paged on (start_time, id)
+    db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    db.Index('ix_Show_updated_at', 'updated_at'),
+    # no double bookings: a venue / an artist can't have two shows whose time ranges overlap.
+    # the gist indexes behind these also serve the availability lookups (needs btree_gist)
+    ExcludeConstraint(('venue_id', '='), ('time_range', '&&'), name='ex_Show_venue_booking', using='gist'),
+    ExcludeConstraint(('artist_id', '='), ('time_range', '&&'), name='ex_Show_artist_booking', using='gist'),
+  )
 
   id = db.Column(db.Integer, primary_key=True)
-  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
-  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
+  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)
+  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False)
   start_time = db.Column(db.DateTime, nullable=False)
+  duration = db.Column(db.Integer, nullable=False, default=120, server_default='120')  # minutes
+  # [start_time, start_time + duration), kept up to date by Postgres
+  time_range = db.Column(TSRANGE, Computed("tsrange(start_time, start_time + duration * interval '1 minute')"))
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                         server_default=UTC_NOW)
 
   # Relationships with venue and artist from above
   venue = db.relationship('Venue', back_populates='shows')
@@ -109,20 +194,714 @@ class Show(db.Model):
   def __repr__(self):
     return f'<Show {self.id} of the Venue {self.venue_id} the Artist {self.artist_id}>'
 
+# Read only: the venue_area_summary materialized view, one row per (city, state) with the
+# area's venues as JSON (see "Area summary" below). It's created by a migration and kept
+# off db.metadata so create_all / autogenerate leave it alone
+area_summary = db.Table(
+  'venue_area_summary', db.MetaData(),
+  db.Column('city', db.String(120)),
+  db.Column('state', db.String(120)),
+  db.Column('num_venues', db.Integer),
+  db.Column('num_upcoming_shows', db.Integer),
+  db.Column('venues', JSONB),
+)
+
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-    format = "EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-    format = "EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+# babel's own named formats combine a date and a time pattern, babel.dates.format_datetime
+# resolves those itself
+BABEL_NAMED_FORMATS = ('full', 'long', 'medium', 'short')
+
+@functools.lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+  # babel pattern and locale parsed once per (format, locale) instead of on every tile
+  if format not in DATETIME_FORMATS and format in BABEL_NAMED_FORMATS:
+    return None, babel.Locale.parse(locale)
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
+@functools.lru_cache(maxsize=4096)
+def format_datetime(value, format='medium', locale='en'):
+  # the views pass datetimes; strings are still accepted (and parsed) for anything older.
+  # memoized, a page full of shows tends to repeat the same start times
+  if isinstance(value, str):
+    value = dateutil.parser.parse(value)
+  pattern, locale = datetime_pattern(format, locale)
+  if pattern is None:
+    return babel.dates.format_datetime(value, format, locale=locale)
+  return pattern.apply(value, locale)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+def page_url(**changes):
+  # this page with some query args swapped and the rest kept, e.g. one section's cursor on a
+  # page paging two (a None value drops the arg)
+  args = request.args.to_dict(flat=False)
+  for name, value in changes.items():
+    if value is None:
+      args.pop(name, None)
+    else:
+      args[name] = value
+  return url_for(request.endpoint, **request.view_args, **args)
+
+app.jinja_env.globals['page_url'] = page_url
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def database_status():
+  # checking the version number and confirming the database name to ensure I am on the right one
+  with db.engine.connect() as conn:
+    version_str = " ".join(conn.execute(text("SELECT version()")).scalar().split()[:2])
+    dbname = conn.execute(text("SELECT current_database()")).scalar()
+  return version_str, dbname
+
+def search_paging():
+  # limit/offset for the search pages, capped so a one letter search can't pull a whole table
+  limit = request.values.get('limit', app.config['SEARCH_RESULTS_LIMIT'], type=int)
+  offset = request.values.get('offset', 0, type=int)
+  limit = max(1, min(limit, app.config['SEARCH_RESULTS_MAX_LIMIT']))
+  return limit, max(0, offset)
+
+def search_by_name(model, search_term, limit, offset):
+  # one query for a page of matches with their stored upcoming show counts; the total
+  # number of matches comes from a window count over the same scan.
+  # the ilike filter is served by the name trigram index and the best matches come first
+  rows = db.session.query(
+    model.id,
+    model.name,
+    model.num_upcoming_shows,
+    db.func.count().over()
+  ).filter(
+    model.name.ilike(f'%{search_term}%'),
+    model.deleted_at.is_(None)
+  ).order_by(
+    db.func.similarity(model.name, search_term).desc(), model.name, model.id
+  ).limit(limit).offset(offset).all()
+
+  data = [{
+    "id": row_id,
+    "name": name,
+    "num_upcoming_shows": upcoming,
+  } for row_id, name, upcoming, total in rows]
+  if rows:
+    count = rows[0][3]
+  elif offset:
+    # paged past the end: the window count came back with no rows, count the matches on their own
+    count = db.session.query(db.func.count(model.id)).filter(
+      model.name.ilike(f'%{search_term}%'),
+      model.deleted_at.is_(None)
+    ).scalar()
+  else:
+    count = 0
+  return {
+    "count": count,
+    "data": data,
+    "limit": limit,
+    "offset": offset,
+    "next_offset": offset + limit if offset + limit < count else None
+  }
+
+def show_cursor(show_id, start_time):
+  # keyset cursor for a page of shows: "<start_time>_<show id>"
+  return f'{start_time.isoformat()}_{show_id}'
+
+def parse_show_cursor(cursor):
+  try:
+    start_time, show_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(start_time), int(show_id)
+  except (AttributeError, ValueError):
+    return None
+
+def keyset_cursor(values):
+  # keyset cursor for the listings / pickers / areas: the last row's order values as a JSON
+  # list, so a NULL city stays NULL and a '|' in a name doesn't matter
+  return json.dumps(list(values), separators=(',', ':'))
+
+def parse_keyset_cursor(cursor, size, id_last=True):
+  # the `size` order values back, or None for a malformed cursor (the caller starts over)
+  try:
+    values = json.loads(cursor)
+  except (TypeError, ValueError):
+    return None
+  if not isinstance(values, list) or len(values) != size:
+    return None
+  *head, last = values
+  if id_last and (not isinstance(last, int) or isinstance(last, bool)):
+    return None
+  if not all(value is None or isinstance(value, str) for value in (head if id_last else values)):
+    return None
+  return values
+
+def keyset_after(order, values):
+  # rows after `values` in ascending `order`, with NULLs sorting last the way Postgres
+  # sorts them (a plain row comparison would drop every row with a NULL in it)
+  conditions = []
+  prefix = []
+  for column, value in zip(order, values):
+    if value is None:
+      # nothing sorts after NULL within this column
+      prefix.append(column.is_(None))
+      continue
+    conditions.append(db.and_(*prefix, column > value))
+    if getattr(column, 'nullable', True) and not getattr(column, 'primary_key', False):
+      conditions.append(db.and_(*prefix, column.is_(None)))
+    prefix.append(column == value)
+  return db.or_(*conditions) if conditions else db.false()
+
+def detail_shows(show_fk, entity_id, other, other_fk, prefix, now, upcoming, cursor):
+  # one page of a venue's / artist's shows joined to the other side's columns in one query.
+  # upcoming shows go oldest first and past shows newest first, both keyset paged on (start_time, id)
+  limit = app.config['DETAIL_SHOWS_PAGE_SIZE']
+  query = db.session.query(
+    Show.id,
+    Show.start_time,
+    other.id,
+    other.name,
+    other.image_link
+  ).join(
+    other, other_fk == other.id
+  ).filter(
+    show_fk == entity_id,
+    other.deleted_at.is_(None)
+  )
+  key = db.tuple_(Show.start_time, Show.id)
+  after = parse_show_cursor(cursor)
+  if upcoming:
+    query = query.filter(Show.start_time >= now).order_by(Show.start_time, Show.id)
+    if after:
+      query = query.filter(key > after)
+  else:
+    query = query.filter(Show.start_time < now).order_by(Show.start_time.desc(), Show.id.desc())
+    if after:
+      query = query.filter(key < after)
+  # one extra row tells us if there is another page
+  rows = query.limit(limit + 1).all()
+
+  shows = [{
+    f"{prefix}_id": other_id,
+    f"{prefix}_name": other_name,
+    f"{prefix}_image_link": other_image_link,
+    "start_time": start_time
+  } for show_id, start_time, other_id, other_name, other_image_link in rows[:limit]]
+  next_cursor = show_cursor(rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+  return shows, next_cursor
+
+def counterpart(model):
+  # the other side of a show: (Artist, Show.artist_id) for Venue and the other way round
+  return (Artist, Show.artist_id) if model is Venue else (Venue, Show.venue_id)
+
+def show_counts(model, show_fk, now):
+  # past / upcoming show counts as correlated subqueries, selected next to the entity row.
+  # shows with a soft deleted venue / artist on the other side don't count
+  other, other_fk = counterpart(model)
+  past = db.session.query(db.func.count(Show.id)).join(other, other_fk == other.id).filter(
+    show_fk == model.id, Show.start_time < now, other.deleted_at.is_(None)
+  ).correlate(model).as_scalar()
+  upcoming = db.session.query(db.func.count(Show.id)).join(other, other_fk == other.id).filter(
+    show_fk == model.id, Show.start_time >= now, other.deleted_at.is_(None)
+  ).correlate(model).as_scalar()
+  return past, upcoming
+
+def listing_page(model, columns, order, seeking):
+  # one keyset page of /venues or /artists, filtered by ?genre= (any of them, or all with
+  # ?genre_match=all), ?city=, ?state= and ?seeking_talent=1 / ?seeking_venue=1.
+  # genres use the array operators (&&, @>) so the GIN index on genres serves them.
+  # the first page counts the matches with a window count in the same query and later pages
+  # carry that total along in ?total= instead of counting again
+  filters = [model.deleted_at.is_(None)]
+  genres = request.args.getlist('genre')
+  if genres:
+    wanted = db.cast(genres, db.ARRAY(db.String))
+    filters.append(model.genres.op('@>' if request.args.get('genre_match') == 'all' else '&&')(wanted))
+  if request.args.get('city'):
+    filters.append(model.city == request.args['city'])
+  if request.args.get('state'):
+    filters.append(model.state == request.args['state'])
+  if request.args.get(seeking.key):
+    filters.append(seeking.is_(True))
+
+  page_size = request.args.get('page_size', app.config['LISTING_PAGE_SIZE'], type=int)
+  page_size = max(1, min(page_size, app.config['LISTING_MAX_PAGE_SIZE']))
+  query = db.session.query(*columns).filter(*filters)
+  # the order values of the previous page's last row, the id always last.
+  # a malformed cursor starts over at the first page
+  cursor = parse_keyset_cursor(request.args.get('after'), len(order))
+  if cursor:
+    query = query.filter(keyset_after(order, cursor))
+  else:
+    query = query.add_columns(db.func.count().over().label('total'))
+  rows = query.order_by(*order).limit(page_size).all()
+
+  if cursor:
+    total = request.args.get('total', type=int)
+  else:
+    total = rows[0].total if rows else 0
+    rows = [row[:-1] for row in rows]
+  next_url = None
+  if len(rows) == page_size:
+    last = dict(zip([c.key for c in columns], rows[-1]))
+    args = request.args.to_dict(flat=False)
+    args.update(after=keyset_cursor(last[c.key] for c in order), total=total)
+    next_url = url_for(request.endpoint, **args)
+  return rows, total, next_url
+
+def area_page():
+  # one page of /venues areas straight from venue_area_summary, keyset paged on (city, state)
+  # with ?areas_after= and optionally narrowed by ?city= / ?state=. Like listing_page, the
+  # first page adds up the total and later pages carry it along in ?total=
+  page_size = app.config['AREA_PAGE_SIZE']
+  query = db.session.query(area_summary.c.city, area_summary.c.state, area_summary.c.venues)
+  if request.args.get('city'):
+    query = query.filter(area_summary.c.city == request.args['city'])
+  if request.args.get('state'):
+    query = query.filter(area_summary.c.state == request.args['state'])
+  order = [area_summary.c.city, area_summary.c.state]
+  # a cursor that doesn't parse starts over at the first page
+  cursor = parse_keyset_cursor(request.args.get('areas_after'), len(order), id_last=False)
+  if cursor:
+    query = query.filter(keyset_after(order, cursor))
+  else:
+    query = query.add_columns(db.cast(db.func.sum(area_summary.c.num_venues).over(), db.Integer))
+  rows = query.order_by(*order).limit(page_size).all()
+
+  if cursor:
+    total = request.args.get('total', type=int)
+  else:
+    total = rows[0][3] if rows else 0
+  areas = [{"city": row[0], "state": row[1], "venues": row[2]} for row in rows]
+  next_url = None
+  if len(rows) == page_size:
+    args = request.args.to_dict(flat=False)
+    args.update(areas_after=keyset_cursor([areas[-1]['city'], areas[-1]['state']]), total=total)
+    next_url = url_for(request.endpoint, **args)
+  return areas, total, next_url
+
+# the columns the detail and edit pages render. they are selected as plain rows instead of
+# hydrating the whole model (no identity map entry, no unused columns loaded)
+PROFILE_FIELDS = {
+  'Venue': ('id', 'name', 'genres', 'address', 'city', 'state', 'phone', 'website_link',
+            'facebook_link', 'seeking_talent', 'seeking_description', 'image_link'),
+  'Artist': ('id', 'name', 'genres', 'city', 'state', 'phone', 'website_link',
+             'facebook_link', 'seeking_venue', 'seeking_description', 'image_link'),
+}
+
+def profile_columns(model):
+  return [getattr(model, field) for field in PROFILE_FIELDS[model.__name__]]
+
+def venue_detail(venue_id):
+  # everything the venue page shows (also served by the JSON API)
+  now = datetime.utcnow()
+  # the venue and both show counts in one query, then one query per page of shows
+  past_count, upcoming_count = show_counts(Venue, Show.venue_id, now)
+  venue = db.session.query(
+    *profile_columns(Venue), past_count.label('past_shows_count'), upcoming_count.label('upcoming_shows_count')
+  ).filter(Venue.id == venue_id, Venue.deleted_at.is_(None)).first_or_404()
+
+  upcoming_shows, upcoming_next = detail_shows(
+    Show.venue_id, venue_id, Artist, Show.artist_id, 'artist', now,
+    upcoming=True, cursor=request.args.get('upcoming_after')
+  )
+  past_shows, past_next = detail_shows(
+    Show.venue_id, venue_id, Artist, Show.artist_id, 'artist', now,
+    upcoming=False, cursor=request.args.get('past_before')
+  )
+
+  data = {
+    "id": venue.id,
+    "name": venue.name,
+    "genres": venue.genres,
+    "address": venue.address,
+    "city": venue.city,
+    "state": venue.state,
+    "phone": venue.phone,
+    "website": venue.website_link,
+    "facebook_link": venue.facebook_link,
+    "seeking_talent": venue.seeking_talent,
+    "seeking_description": venue.seeking_description,
+    "image_link": venue.image_link,
+    "past_shows": past_shows,
+    "upcoming_shows": upcoming_shows,
+    "past_shows_count": venue.past_shows_count,
+    "upcoming_shows_count": venue.upcoming_shows_count,
+    "upcoming_next_cursor": upcoming_next,
+    "past_next_cursor": past_next,
+  }
+  return data
+
+def artist_detail(artist_id):
+  # everything the artist page shows (also served by the JSON API)
+  now = datetime.utcnow()
+  # the artist and both show counts in one query, then one query per page of shows
+  past_count, upcoming_count = show_counts(Artist, Show.artist_id, now)
+  artist = db.session.query(
+    *profile_columns(Artist), past_count.label('past_shows_count'), upcoming_count.label('upcoming_shows_count')
+  ).filter(Artist.id == artist_id, Artist.deleted_at.is_(None)).first_or_404()
+
+  upcoming_shows, upcoming_next = detail_shows(
+    Show.artist_id, artist_id, Venue, Show.venue_id, 'venue', now,
+    upcoming=True, cursor=request.args.get('upcoming_after')
+  )
+  past_shows, past_next = detail_shows(
+    Show.artist_id, artist_id, Venue, Show.venue_id, 'venue', now,
+    upcoming=False, cursor=request.args.get('past_before')
+  )
+
+  data = {
+    "id": artist.id,
+    "name": artist.name,
+    "genres": artist.genres,
+    "city": artist.city,
+    "state": artist.state,
+    "phone": artist.phone,
+    "website": artist.website_link,
+    "facebook_link": artist.facebook_link,
+    "seeking_venue": artist.seeking_venue,
+    "seeking_description": artist.seeking_description,
+    "image_link": artist.image_link,
+    "past_shows": past_shows,
+    "upcoming_shows": upcoming_shows,
+    "past_shows_count": artist.past_shows_count,
+    "upcoming_shows_count": artist.upcoming_shows_count,
+    "upcoming_next_cursor": upcoming_next,
+    "past_next_cursor": past_next,
+  }
+  return data
+
+def shows_page():
+  # one keyset page of the /shows listing (upcoming only unless ?when=all), with only the
+  # columns a show tile needs instead of whole Venue / Artist rows
+  page_size = request.args.get('page_size', app.config['SHOWS_PAGE_SIZE'], type=int)
+  page_size = max(1, min(page_size, app.config['SHOWS_MAX_PAGE_SIZE']))
+  query = db.session.query(
+    Show.id,
+    Show.start_time,
+    Venue.id,
+    Venue.name,
+    Artist.id,
+    Artist.name,
+    Artist.image_link
+  ).join(
+    Venue, Show.venue_id == Venue.id
+  ).join(
+    Artist, Show.artist_id == Artist.id
+  ).order_by(
+    Show.start_time, Show.id
+  )
+  query = query.filter(Venue.deleted_at.is_(None), Artist.deleted_at.is_(None))
+  if request.args.get('when') != 'all':
+    query = query.filter(Show.start_time >= datetime.utcnow())
+  after = parse_show_cursor(request.args.get('after'))
+  if after:
+    query = query.filter(db.tuple_(Show.start_time, Show.id) > after)
+  return query.limit(page_size), page_size
+
+def rebuild_suggestions():
+  # a fresh typeahead index from two id/name scans. Lookups never wait for it, they keep
+  # answering from the current index (see run_suggestion_refresh)
+  if not suggestions.start_build():
+    return
+  try:
+    venues = db.session.query(Venue.id, Venue.name).filter(Venue.deleted_at.is_(None))
+    artists = db.session.query(Artist.id, Artist.name).filter(Artist.deleted_at.is_(None))
+    suggestions.build([('venues', venue_id, name) for venue_id, name in venues] +
+                      [('artists', artist_id, name) for artist_id, name in artists])
+  finally:
+    suggestions.release()
+
+SUGGESTION_THREAD = 'suggestion-refresh'
+
+def run_suggestion_refresh():
+  # background thread: rebuild now, then again every SUGGEST_REFRESH_SECONDS
+  with app.app_context():
+    try:
+      rebuild_suggestions()
+    except Exception as e:
+      app.logger.warning('suggestion index rebuild failed: %s', e)
+  if app.config['SUGGEST_REFRESH_SECONDS']:
+    timer = threading.Timer(app.config['SUGGEST_REFRESH_SECONDS'], run_suggestion_refresh)
+    timer.name = SUGGESTION_THREAD
+    timer.daemon = True
+    timer.start()
+
+@app.before_first_request
+def start_suggestion_refresh():
+  # once per worker, on its first request rather than at import: the flask commands import
+  # the app too, and a thread started before gunicorn forks the workers wouldn't survive it
+  threading.Thread(target=run_suggestion_refresh, name=SUGGESTION_THREAD, daemon=True).start()
+
+def picker_page(model, columns):
+  # one page of {id, name, city, state} for the show form pickers, keyset paged on (name, id)
+  # and optionally narrowed down with ?q= (the name trigram index serves the ilike)
+  page_size = app.config['PICKER_PAGE_SIZE']
+  query = db.session.query(*columns).filter(model.deleted_at.is_(None))
+  if request.args.get('q'):
+    query = query.filter(model.name.ilike(f"%{request.args['q']}%"))
+  order = [model.name, model.id]
+  # a cursor that doesn't parse starts over at the first page
+  cursor = parse_keyset_cursor(request.args.get('after'), len(order))
+  if cursor:
+    query = query.filter(keyset_after(order, cursor))
+  rows = query.order_by(*order).limit(page_size + 1).all()
+  results = [dict(zip([c.key for c in columns], row)) for row in rows[:page_size]]
+  next_after = keyset_cursor([results[-1]['name'], results[-1]['id']]) if len(rows) > page_size else None
+  return {"results": results, "next_after": next_after}
+
+def missing_show_references(venue_id, artist_id):
+  # which of the show form's foreign keys point nowhere, both checked in one query
+  venue_exists, artist_exists = db.session.query(
+    db.exists().where(db.and_(Venue.id == venue_id, Venue.deleted_at.is_(None))),
+    db.exists().where(db.and_(Artist.id == artist_id, Artist.deleted_at.is_(None)))
+  ).one()
+  return [name for name, exists in (('venue', venue_exists), ('artist', artist_exists)) if not exists]
+
+def booking_conflict_message(error):
+  # the exclusion constraints on Show reject double bookings with SQLSTATE 23P01
+  if getattr(error.orig, 'pgcode', None) != '23P01':
+    return None
+  side = 'artist' if error.orig.diag.constraint_name == 'ex_Show_artist_booking' else 'venue'
+  return f'Sorry, that {side} is already booked for part of that time. Pick another start time or duration.'
+
+def parse_window(default_days):
+  # ?start= / ?end= (ISO dates or datetimes, converted to UTC by forms.parse_utc) for the
+  # availability lookups, start defaults to now
+  start = parse_utc(request.args['start']) if request.args.get('start') else datetime.utcnow()
+  end = parse_utc(request.args['end']) if request.args.get('end') else start + timedelta(days=default_days)
+  if end <= start:
+    raise ValueError('end must be after start')
+  if end - start > timedelta(days=app.config['AVAILABILITY_MAX_DAYS']):
+    raise ValueError(f"at most {app.config['AVAILABILITY_MAX_DAYS']} days at a time")
+  return start, end
+
+def free_slots(show_fk, entity_id, start, end, min_minutes):
+  # the booked ranges of a venue's / artist's shows overlapping [start, end) and the gaps between
+  # them. the (fk, time_range &&) filter is served by the booking exclusion constraint's gist index,
+  # so only the shows inside the window are read
+  window = db.func.tsrange(start, end)
+  booked = db.session.query(
+    db.func.lower(Show.time_range),
+    db.func.upper(Show.time_range)
+  ).filter(
+    show_fk == entity_id,
+    Show.time_range.op('&&')(window)
+  ).order_by(db.func.lower(Show.time_range)).all()
+
+  min_length = timedelta(minutes=min_minutes)
+  free = []
+  slot_start = start
+  for booked_start, booked_end in booked + [(end, end)]:
+    if booked_start - slot_start >= min_length:
+      free.append({"start": slot_start, "end": booked_start})
+    slot_start = max(slot_start, booked_end)
+  return {
+    "start": start,
+    "end": end,
+    "booked": [{"start": max(b_start, start), "end": min(b_end, end)} for b_start, b_end in booked],
+    "free": free
+  }
+
+#----------------------------------------------------------------------------#
+# Counters.
+#   Venue.num_upcoming_shows / Artist.num_upcoming_shows are denormalized counts
+#   of shows with start_time >= now, the same split as the detail pages'
+#   upcoming / past sections. Show writes adjust them in the same
+#   transaction and `flask counters roll` catches shows that moved into the past.
+#----------------------------------------------------------------------------#
+
+def adjust_upcoming_counts(venue_id, artist_id, delta):
+  Venue.query.filter(Venue.id == venue_id).update(
+    {Venue.num_upcoming_shows: Venue.num_upcoming_shows + delta}, synchronize_session=False
+  )
+  Artist.query.filter(Artist.id == artist_id).update(
+    {Artist.num_upcoming_shows: Artist.num_upcoming_shows + delta}, synchronize_session=False
+  )
+
+def release_upcoming_counts(*criteria):
+  # takes the upcoming shows matching `criteria` off their venues' and artists' counters,
+  # one set based UPDATE per side. call it before deleting those shows
+  now = datetime.utcnow()
+  for model, show_fk in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    upcoming = db.session.query(
+      show_fk.label('entity_id'),
+      db.func.count(Show.id).label('num_shows')
+    ).filter(
+      Show.start_time >= now, *criteria
+    ).group_by(show_fk).subquery()
+    db.session.execute(
+      model.__table__.update().values(
+        num_upcoming_shows=model.num_upcoming_shows - upcoming.c.num_shows
+      ).where(model.id == upcoming.c.entity_id)
+    )
+
+def live_upcoming_count(model, show_fk, now):
+  # shows booked with a soft deleted venue / artist were released when it was deleted
+  other, other_fk = counterpart(model)
+  return db.session.query(db.func.count(Show.id)).join(other, other_fk == other.id).filter(
+    show_fk == model.id, Show.start_time >= now, other.deleted_at.is_(None)
+  ).correlate(model).as_scalar()
+
+def recompute_upcoming_counts(model, show_fk, now, ids=None):
+  # resets the stored counters to the live count, for every row or only for `ids`
+  update = model.__table__.update().values(num_upcoming_shows=live_upcoming_count(model, show_fk, now))
+  if ids is not None:
+    update = update.where(model.id.in_(ids))
+  return db.session.execute(update).rowcount
+
+#----------------------------------------------------------------------------#
+# Area summary.
+#   venue_area_summary backs the /venues page. Venue and show writes schedule a
+#   concurrent refresh a few seconds later (one per burst of writes), and
+#   `flask areas refresh` runs it from cron to catch everything else (counter
+#   rolls, other workers' timers that died with their worker).
+#----------------------------------------------------------------------------#
+
+area_refresh = {'timer': None}
+area_refresh_lock = threading.Lock()
+
+def refresh_area_summary():
+  # CONCURRENTLY keeps /venues readable meanwhile (it needs the unique index on city, state)
+  db.session.execute(text('REFRESH MATERIALIZED VIEW CONCURRENTLY venue_area_summary'))
+  db.session.commit()
+  cache.invalidate('venues')
+
+def schedule_area_refresh():
+  if not app.config['VENUE_AREAS_FROM_SUMMARY']:
+    return
+  with area_refresh_lock:
+    if area_refresh['timer'] is None:
+      timer = threading.Timer(app.config['AREA_SUMMARY_REFRESH_DELAY'], run_area_refresh)
+      timer.daemon = True
+      area_refresh['timer'] = timer
+      timer.start()
+
+def run_area_refresh():
+  with area_refresh_lock:
+    area_refresh['timer'] = None
+  with app.app_context():
+    try:
+      refresh_area_summary()
+    except Exception as e:
+      app.logger.warning('area summary refresh failed: %s', e)
+
+#----------------------------------------------------------------------------#
+# Cache invalidation.
+#   Which cached pages (see cache.py) a write makes stale.
+#----------------------------------------------------------------------------#
+
+def invalidate_venue(venue_id):
+  # the venue's own page, the listings, and the artist pages showing its shows
+  artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+  cache.invalidate('venues', 'shows', f'venue:{venue_id}', *(f'artist:{artist_id}' for artist_id, in artist_ids))
+  schedule_area_refresh()
+
+def invalidate_artist(artist_id):
+  venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+  cache.invalidate('artists', 'shows', f'artist:{artist_id}', *(f'venue:{venue_id}' for venue_id, in venue_ids))
+
+def invalidate_show(venue_id, artist_id):
+  # /venues lists the venues' upcoming show counts
+  cache.invalidate('venues', 'shows', f'venue:{venue_id}', f'artist:{artist_id}')
+  # the venue's upcoming show count is part of its area's summary row
+  schedule_area_refresh()
+
+#----------------------------------------------------------------------------#
+# Conditional GETs.
+#   The HTML pages carry Last-Modified = the newest updated_at among the rows
+#   they show (or the start of the last show that moved from upcoming to past,
+#   whichever is later) and an ETag over that, the URL and the asset build.
+#   A repeat view answers 304 from one index backed aggregate query, before
+#   the page cache or the template is touched. The ETag is also part of the
+#   page cache key, so a page cached by one worker is never served after
+#   another worker's write (the memory cache's invalidations stay in the
+#   worker that wrote). That holds for the views under @conditional with a
+#   validator; the /venues summary pages have none and get a short TTL
+#   instead (AREA_PAGE_CACHE_TTL).
+#----------------------------------------------------------------------------#
+
+def latest(*values):
+  values = [value for value in values if value is not None]
+  return max(values) if values else None
+
+def last_started(*criteria):
+  # the newest show start that has passed: pages splitting past / upcoming change then
+  return db.session.query(db.func.max(Show.start_time)).filter(Show.start_time < datetime.utcnow(), *criteria).as_scalar()
+
+def listing_modified(model):
+  # soft deletes bump updated_at too, only `flask purge` removes rows (already hidden ones)
+  return db.session.query(db.func.max(model.updated_at)).scalar()
+
+def venues_from_summary():
+  # /venues without venue level filters reads whole areas from the summary view
+  return app.config['VENUE_AREAS_FROM_SUMMARY'] and not request.args.getlist('genre') and not request.args.get('seeking_talent')
+
+def venues_modified():
+  if venues_from_summary():
+    # the summary view lags the Venue table until its next refresh, no validator for it
+    return None
+  return listing_modified(Venue)
+
+def venues_cache_ttl():
+  # without a validator nothing tells other workers their copy is stale, keep it short
+  return app.config['AREA_PAGE_CACHE_TTL'] if venues_from_summary() else None
+
+def shows_modified():
+  # show tiles carry venue and artist names too
+  return latest(*db.session.query(
+    db.session.query(db.func.max(Show.updated_at)).as_scalar(),
+    db.session.query(db.func.max(Venue.updated_at)).as_scalar(),
+    db.session.query(db.func.max(Artist.updated_at)).as_scalar(),
+    last_started(),
+  ).one())
+
+def detail_modified(model, show_fk, entity_id):
+  # the entity, its shows and the venues / artists on the other side of them
+  other, other_fk = counterpart(model)
+  row = db.session.query(
+    model.updated_at,
+    db.func.max(Show.updated_at),
+    db.func.max(other.updated_at),
+    db.func.max(Show.start_time).filter(Show.start_time < datetime.utcnow()),
+  ).outerjoin(
+    Show, show_fk == model.id
+  ).outerjoin(
+    other, other_fk == other.id
+  ).filter(
+    model.id == entity_id, model.deleted_at.is_(None)
+  ).group_by(model.id).first()
+  return latest(*row) if row else None
+
+def conditional(last_modified):
+  # last_modified(**view_args) -> datetime or None (no validator, the view runs as usual)
+  def decorator(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+      # pages carrying a flash message are one-offs
+      if request.method != 'GET' or '_flashes' in session:
+        return view(*args, **kwargs)
+      modified = last_modified(**kwargs)
+      if modified is None:
+        return view(*args, **kwargs)
+      etag = hashlib.sha1(f'{assets.version}|{request.full_path}|{modified.isoformat()}'.encode()).hexdigest()
+      if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        response = Response(status=304)
+      else:
+        g.page_etag = etag
+        response = app.make_response(view(*args, **kwargs))
+      response.set_etag(etag)
+      response.last_modified = modified
+      # always revalidate, the 304 above is cheap
+      response.cache_control.no_cache = True
+      return response
+    return wrapper
+  return decorator
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
@@ -135,98 +914,62 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@replicas.read_only
+@conditional(venues_modified)
+@cache.cached('venues', ttl=venues_cache_ttl)
 def venues():
   # DONETODO: replace with real venues data.
   #       I think DONE also: num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
+  if venues_from_summary():
+    # no venue level filters: whole areas come prebuilt from the summary view
+    areas, total, next_url = area_page()
+    return render_template('pages/venues.html', areas=areas, total=total, next_url=next_url,
+                           genres=Genre.values, states=State.values)
+
+  # one query for a page of venues with their stored upcoming show counts, ordered by area
+  # so the areas can be built in a single pass below (no query per area / per venue)
+  rows, total, next_url = listing_page(
+    Venue,
+    [Venue.id, Venue.name, Venue.city, Venue.state, Venue.num_upcoming_shows],
+    [Venue.city, Venue.state, Venue.id],
+    Venue.seeking_talent
+  )
+
   data = []
-  # this is getting all unique city & state pairs
-  locations = Venue.query.with_entities(Venue.city, Venue.state).distinct().all()
-  for city, state in locations:
-    # showing all the venues in this specific area
-    venues_in_area = Venue.query.filter_by(city=city, state=state).all()
-    venue_data = []
-    for venue in venues_in_area:
-      # Summing up number of upcoming shows
-      num_upcoming_shows = Show.query.filter(
-        Show.venue_id == venue.id,
-        Show.start_time > datetime.utcnow()
-      ).count()
-      venue_data.append({
-        "id": venue.id,
-        "name": venue.name,
-        "num_upcoming_shows": num_upcoming_shows
+  for venue_id, name, city, state, num_upcoming_shows in rows:
+    # rows come sorted by area, so a new area starts whenever city/state changes
+    if not data or data[-1]["city"] != city or data[-1]["state"] != state:
+      data.append({
+        "city": city,
+        "state": state,
+        "venues": []
       })
-    data.append({
-      "city": city,
-      "state": state,
-      "venues": venue_data
+    data[-1]["venues"].append({
+      "id": venue_id,
+      "name": name,
+      "num_upcoming_shows": num_upcoming_shows
     })
-  return render_template('pages/venues.html', areas=data)
+  return render_template('pages/venues.html', areas=data, total=total, next_url=next_url,
+                         genres=Genre.values, states=State.values)
 
 @app.route('/venues/search', methods=['POST'])
+@replicas.read_only
 def search_venues():
   # DONETODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for Hop should return "The Musical Hop".
   # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
   search_term = request.form.get('search_term', '')
+  limit, offset = search_paging()
   # note case insensitive search
-  venues = Venue.query.filter(Venue.name.ilike(f'%{search_term}%')).all()
-  data = []
-  for venue in venues:
-    num_upcoming_shows = Show.query.filter(
-      Show.venue_id == venue.id,
-      Show.start_time > datetime.utcnow()
-    ).count()
-    data.append({
-      "id": venue.id,
-      "name": venue.name,
-      "num_upcoming_shows": num_upcoming_shows,
-    })
-  response = {
-    "count": len(data),
-    "data": data
-  }
+  response = search_by_name(Venue, search_term, limit, offset)
   return render_template('pages/search_venues.html', results=response, search_term=search_term)
 
 @app.route('/venues/<int:venue_id>')
+@replicas.read_only
+@conditional(lambda venue_id: detail_modified(Venue, Show.venue_id, venue_id))
+@cache.cached('venue:{venue_id}')
 def show_venue(venue_id):
-  venue = Venue.query.get_or_404(venue_id)
-  now = datetime.utcnow()
-
-  past_shows = []
-  upcoming_shows = []
-
-  for show in venue.shows:
-    show_info = {
-      "artist_id": show.artist.id,
-      "artist_name": show.artist.name,
-      "artist_image_link": show.artist.image_link,
-      "start_time": show.start_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    }
-    if show.start_time < now:
-      past_shows.append(show_info)
-    else:
-      upcoming_shows.append(show_info)
-
-  data = {
-    "id": venue.id,
-    "name": venue.name,
-    "genres": venue.genres,
-    "address": venue.address,
-    "city": venue.city,
-    "state": venue.state,
-    "phone": venue.phone,
-    "website": venue.website_link,
-    "facebook_link": venue.facebook_link,
-    "seeking_talent": venue.seeking_talent,
-    "seeking_description": venue.seeking_description,
-    "image_link": venue.image_link,
-    "past_shows": past_shows,
-    "upcoming_shows": upcoming_shows,
-    "past_shows_count": len(past_shows),
-    "upcoming_shows_count": len(upcoming_shows),
-  }
-  return render_template('pages/show_venue.html', venue=data)
+  return render_template('pages/show_venue.html', venue=venue_detail(venue_id))
 
 #  Create Venue
 #  ----------------------------------------------------------------
@@ -246,7 +989,9 @@ def create_venue_submission():
 
   if form.validate_on_submit():
     # duplicate check
-    existing_venue = Venue.query.filter_by(name=form.name.data, address=form.address.data).first()
+    existing_venue = db.session.query(Venue.query.filter_by(
+      name=form.name.data, address=form.address.data, deleted_at=None
+    ).exists()).scalar()
     if existing_venue:
       flash('Oops ... it looks like a venue with this name and address already exists. Try again with a different name or address.')
       return render_template('forms/new_venue.html', form=form)
@@ -266,6 +1011,9 @@ def create_venue_submission():
       )
       db.session.add(new_venue)
       db.session.commit()
+      cache.invalidate('venues')
+      schedule_area_refresh()
+      suggestions.add('venues', new_venue.id, new_venue.name)
       # on successful db insert, flash success
       flash('YES! The venue' + new_venue.name + ' was successfully listed :)')
       return render_template('pages/home.html')
@@ -290,11 +1038,21 @@ def create_venue_submission():
 def delete_venue(venue_id):
   error = False
   try:
-    venue = Venue.query.get(venue_id)
-    if not venue:
+    # soft delete: one UPDATE, the venue's shows stay until `flask purge` removes them in batches
+    deleted = Venue.query.filter_by(id=venue_id, deleted_at=None).update(
+      {Venue.deleted_at: datetime.utcnow()}, synchronize_session=False
+    )
+    if not deleted:
       return jsonify({'success': False, 'message': 'Venue not found!'}), 404
-    db.session.delete(venue)  # This honors cascade
+    # its shows no longer count, so their artists lose those upcoming shows
+    # (shows with an already deleted artist were released back then)
+    release_upcoming_counts(Show.venue_id == venue_id, ~Show.artist_id.in_(
+      db.session.query(Artist.id).filter(Artist.deleted_at.isnot(None))
+    ))
     db.session.commit()
+    # only after the commit: a reader in between would re-cache the old page under the new version
+    invalidate_venue(venue_id)
+    suggestions.remove('venues', venue_id)
   except Exception as e:
     error = True
     db.session.rollback()
@@ -310,80 +1068,73 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 
+@app.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+  # same as delete_venue
+  error = False
+  try:
+    deleted = Artist.query.filter_by(id=artist_id, deleted_at=None).update(
+      {Artist.deleted_at: datetime.utcnow()}, synchronize_session=False
+    )
+    if not deleted:
+      return jsonify({'success': False, 'message': 'Artist not found!'}), 404
+    release_upcoming_counts(Show.artist_id == artist_id, ~Show.venue_id.in_(
+      db.session.query(Venue.id).filter(Venue.deleted_at.isnot(None))
+    ))
+    db.session.commit()
+    invalidate_artist(artist_id)
+    # its venues' upcoming counts changed
+    schedule_area_refresh()
+    suggestions.remove('artists', artist_id)
+  except Exception as e:
+    error = True
+    db.session.rollback()
+    app.logger.warning('artist %s could not be deleted: %s', artist_id, e)
+  finally:
+    db.session.close()
+
+  if error:
+    return jsonify({'success': False, 'message': 'Artist was not successfully deleted!'}), 500
+  return jsonify({'success': True, 'message': 'Artist was successfully deleted!'}), 200
+
 @app.route('/artists')
+@replicas.read_only
+@conditional(lambda: listing_modified(Artist))
+@cache.cached('artists')
 def artists():
-  artists = Artist.query.all()
+  rows, total, next_url = listing_page(
+    Artist,
+    [Artist.id, Artist.name],
+    [Artist.id],
+    Artist.seeking_venue
+  )
   data = []
-  for artist in artists:
+  for artist_id, name in rows:
     data.append({
-      "id": artist.id,
-      "name": artist.name
+      "id": artist_id,
+      "name": name
     })
-  return render_template('pages/artists.html', artists=data)
+  return render_template('pages/artists.html', artists=data, total=total, next_url=next_url,
+                         genres=Genre.values, states=State.values)
   # # DONETODO: replace with real data returned from querying the database
 
 @app.route('/artists/search', methods=['POST'])
+@replicas.read_only
 def search_artists():
   # DONETODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
   # search for "band" should return "The Wild Sax Band".
   search_term = request.form.get('search_term', '')
-  artists = Artist.query.filter(Artist.name.ilike(f'%{search_term}%')).all()
-  data = []
-  for artist in artists:
-    num_upcoming_shows = Show.query.filter(
-      Show.artist_id == artist.id,
-      Show.start_time > datetime.utcnow()
-    ).count()
-    data.append({
-      "id": artist.id,
-      "name": artist.name,
-      "num_upcoming_shows": num_upcoming_shows,
-    })
-  response = {
-    "count": len(data),
-    "data": data
-  }
+  limit, offset = search_paging()
+  response = search_by_name(Artist, search_term, limit, offset)
   return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
 @app.route('/artists/<int:artist_id>')
+@replicas.read_only
+@conditional(lambda artist_id: detail_modified(Artist, Show.artist_id, artist_id))
+@cache.cached('artist:{artist_id}')
 def show_artist(artist_id):
-  artist = Artist.query.get_or_404(artist_id)
-  now = datetime.utcnow()
-
-  past_shows = []
-  upcoming_shows = []
-
-  for show in artist.shows:
-    show_info = {
-      "venue_id": show.venue.id,
-      "venue_name": show.venue.name,
-      "venue_image_link": show.venue.image_link,
-      "start_time": show.start_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    }
-    if show.start_time < now:
-      past_shows.append(show_info)
-    else:
-      upcoming_shows.append(show_info)
-
-  data = {
-    "id": artist.id,
-    "name": artist.name,
-    "genres": artist.genres,
-    "city": artist.city,
-    "state": artist.state,
-    "phone": artist.phone,
-    "website": artist.website_link,
-    "facebook_link": artist.facebook_link,
-    "seeking_venue": artist.seeking_venue,
-    "seeking_description": artist.seeking_description,
-    "image_link": artist.image_link,
-    "past_shows": past_shows,
-    "upcoming_shows": upcoming_shows,
-    "past_shows_count": len(past_shows),
-    "upcoming_shows_count": len(upcoming_shows)
-  }
-  return render_template('pages/show_artist.html', artist=data)
+  return render_template('pages/show_artist.html', artist=artist_detail(artist_id))
 
   # # DONETODO: replace with real artist data from the artist table, using artist_id
 
@@ -393,7 +1144,7 @@ def show_artist(artist_id):
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
   form = ArtistForm()
-  artist = Artist.query.get_or_404(artist_id)
+  artist = db.session.query(*profile_columns(Artist)).filter(Artist.id == artist_id, Artist.deleted_at.is_(None)).first_or_404()
 
   # the form get prepopulated below when editing
   form.name.data = artist.name
@@ -415,7 +1166,7 @@ def edit_artist_submission(artist_id):
   # DONETODO: take values from the form submitted, and update existing
   # artist record with ID <artist_id> using the new attributes
   form = ArtistForm()
-  artist = Artist.query.get_or_404(artist_id)
+  artist = Artist.query.filter_by(id=artist_id, deleted_at=None).first_or_404()
   error = False
 
   if form.validate_on_submit():
@@ -432,6 +1183,8 @@ def edit_artist_submission(artist_id):
       artist.genres = form.genres.data
 
       db.session.commit()
+      invalidate_artist(artist_id)
+      suggestions.add('artists', artist_id, form.name.data)
     except Exception as e:
       error = True
       db.session.rollback()
@@ -442,7 +1195,7 @@ def edit_artist_submission(artist_id):
       flash(f'Unfortunatly, an error occurred here. Artist {form.name.data} could not be updated.')
       return redirect(url_for('edit_artist', artist_id=artist_id))
     else:
-      flash('YES! Artist ' + artist.name + ' was successfully updated!')
+      flash('YES! Artist ' + form.name.data + ' was successfully updated!')
       return redirect(url_for('show_artist', artist_id=artist_id))
   else:
     flash('ERROR: Form validation failed! Please correct errors and try again. ')
@@ -451,7 +1204,7 @@ def edit_artist_submission(artist_id):
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
   form = VenueForm()
-  venue = Venue.query.get_or_404(venue_id)
+  venue = db.session.query(*profile_columns(Venue)).filter(Venue.id == venue_id, Venue.deleted_at.is_(None)).first_or_404()
 
   # DONETODO: populate form with values from venue with ID <venue_id>
   form.name.data = venue.name
@@ -475,7 +1228,7 @@ def edit_venue_submission(venue_id):
   form = VenueForm(request.form)
   error = False
   try:
-    venue = Venue.query.get_or_404(venue_id)
+    venue = Venue.query.filter_by(id=venue_id, deleted_at=None).first_or_404()
     venue.name = form.name.data
     venue.city = form.city.data
     venue.state = form.state.data
@@ -488,6 +1241,8 @@ def edit_venue_submission(venue_id):
     venue.image_link = form.image_link.data
     venue.genres = form.genres.data
     db.session.commit()
+    invalidate_venue(venue_id)
+    suggestions.add('venues', venue_id, form.name.data)
   except Exception as e:
     error = True
     db.session.rollback()
@@ -531,6 +1286,8 @@ def create_artist_submission():
       )
       db.session.add(new_artist)
       db.session.commit()
+      cache.invalidate('artists')
+      suggestions.add('artists', new_artist.id, new_artist.name)
       # push success message when DB inserted
       flash('The Artist ' + new_artist.name + ' was successfully listed :)')
       return render_template('pages/home.html')
@@ -552,21 +1309,52 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@replicas.read_only
+@conditional(shows_modified)
+@cache.cached('shows')
 def shows():
-  shows = Show.query.join(Venue).join(Artist).all()
+  # displays one page of shows at /shows, "next" pages through the rest
+  query, page_size = shows_page()
   data = []
-  for show in shows:
+  for show_id, start_time, venue_id, venue_name, artist_id, artist_name, artist_image_link in query:
     data.append({
-      "venue_id": show.venue_id,
-      "venue_name": show.venue.name,
-      "artist_id": show.artist_id,
-      "artist_name": show.artist.name,
-      "artist_image_link": show.artist.image_link,
-      "start_time": show.start_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+      "venue_id": venue_id,
+      "venue_name": venue_name,
+      "artist_id": artist_id,
+      "artist_name": artist_name,
+      "artist_image_link": artist_image_link,
+      "start_time": start_time
     })
-  return render_template('pages/shows.html', shows=data)
-  # displays list of shows at /shows
-  # # DONETODO: replace with real venues data.
+  next_cursor = show_cursor(show_id, start_time) if len(data) == page_size else None
+  return render_template('pages/shows.html', shows=data, next_cursor=next_cursor, page_size=page_size,
+                         when=request.args.get('when'))
+
+@app.route('/shows.json')
+@replicas.read_only
+def shows_json():
+  # same page as /shows, streamed out as JSON row by row instead of built up in memory
+  query, page_size = shows_page()
+
+  def generate():
+    yield '{"shows": ['
+    count = 0
+    last = None
+    for show_id, start_time, venue_id, venue_name, artist_id, artist_name, artist_image_link in query.yield_per(100):
+      yield (',' if count else '') + json.dumps({
+        "id": show_id,
+        "venue_id": venue_id,
+        "venue_name": venue_name,
+        "artist_id": artist_id,
+        "artist_name": artist_name,
+        "artist_image_link": artist_image_link,
+        "start_time": start_time.isoformat()
+      })
+      count += 1
+      last = (show_id, start_time)
+    next_cursor = show_cursor(*last) if count == page_size else None
+    yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+
+  return Response(stream_with_context(generate()), mimetype='application/json')
 
 @app.route('/shows/create')
 def create_shows():
@@ -583,17 +1371,29 @@ def create_show_submission():
   error = False
 
   if form.validate_on_submit():
+    missing = missing_show_references(form.venue_id.data, form.artist_id.data)
+    if missing:
+      flash(f"Sorry, there is no {' and no '.join(missing)} with that ID. Pick one from the list.")
+      return render_template('forms/new_show.html', form=form)
     try:
       new_show = Show(
         artist_id=form.artist_id.data,
         venue_id=form.venue_id.data,
-        start_time=form.start_time.data
+        start_time=form.start_time.data,
+        duration=form.duration.data
       )
       db.session.add(new_show)
+      if new_show.start_time >= datetime.utcnow():
+        adjust_upcoming_counts(new_show.venue_id, new_show.artist_id, 1)
       db.session.commit()
+      invalidate_show(new_show.venue_id, new_show.artist_id)
       # success message on DB insert
       flash('Yes! Show was successfully listed :) Lets party.')
       return render_template('pages/home.html')
+    except IntegrityError as e:
+      db.session.rollback()
+      flash(booking_conflict_message(e) or f'Unfortunaely, an error occurred. Show could not be listed. Error note: {str(e)}')
+      error = True
     except Exception as e:
       db.session.rollback()
       # DONETODO: on unsuccessful db insert, flash an error instead.
@@ -610,8 +1410,199 @@ def create_show_submission():
   if error:
     return render_template('forms/new_show.html', form=form)
 
+#  Health
+#  ----------------------------------------------------------------
+
+@app.route('/health/ready')
+def ready():
+  # readiness probe for the load balancer / orchestrator
+  try:
+    version_str, dbname = database_status()
+  except Exception as e:
+    # the error names the database host / user, it only goes to the log
+    app.logger.warning('readiness check failed: %s', e)
+    return jsonify({'ready': False, 'error': 'database unavailable'}), 503
+  return jsonify({'ready': True, 'database': dbname, 'postgres': version_str})
+
+#  Cache
+#  ----------------------------------------------------------------
+
+@app.route('/cache/stats')
+def cache_stats():
+  # hit / miss / eviction counters for sizing CACHE_MAX_ENTRIES and CACHE_DEFAULT_TTL,
+  # plus the size and age of the typeahead index
+  return jsonify(dict(cache.stats(), suggestions=suggestions.stats()))
+
+#  API
+#  ----------------------------------------------------------------
+#  /api/v1 serves the same queries as the pages above as compact JSON (no
+#  templates), with ETags so clients can revalidate with If-None-Match.
+#  The views are plain sync views like the pages: concurrent clients are
+#  served by gunicorn's gthread workers (gunicorn.conf.py). api_pool only
+#  lets search run its venue and artist queries side by side.
+
+api_pool = ThreadPoolExecutor(max_workers=app.config['API_THREAD_POOL_WORKERS'])
+
+def json_default(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def api_body(payload):
+  if orjson is not None:
+    return orjson.dumps(payload)
+  return json.dumps(payload, separators=(',', ':'), default=json_default).encode('utf-8')
+
+def api_response(payload):
+  body = api_body(payload)
+  response = Response(body, mimetype='application/json')
+  response.set_etag(hashlib.sha1(body).hexdigest())
+  # answers 304 with no body when If-None-Match matches
+  return response.make_conditional(request)
+
+def in_app_context(fn, *args):
+  # runs fn on a pool thread with its own app context (and so its own DB session)
+  replica = g.get('db_replica')
+  def run():
+    with app.app_context():
+      # same database as the request that submitted it
+      g.db_replica = replica
+      return fn(*args)
+  return api_pool.submit(run)
+
+@app.route('/api/v1/venues')
+@replicas.read_only
+def api_venues():
+  rows, total, next_url = listing_page(
+    Venue,
+    [Venue.id, Venue.name, Venue.city, Venue.state, Venue.num_upcoming_shows],
+    [Venue.city, Venue.state, Venue.id],
+    Venue.seeking_talent
+  )
+  return api_response({
+    "venues": [{
+      "id": venue_id,
+      "name": name,
+      "city": city,
+      "state": state,
+      "num_upcoming_shows": num_upcoming_shows
+    } for venue_id, name, city, state, num_upcoming_shows in rows],
+    "total": total,
+    "next_url": next_url
+  })
+
+@app.route('/api/v1/venues/<int:venue_id>')
+@replicas.read_only
+def api_venue(venue_id):
+  return api_response(venue_detail(venue_id))
+
+@app.route('/api/v1/artists')
+@replicas.read_only
+def api_artists():
+  rows, total, next_url = listing_page(
+    Artist,
+    [Artist.id, Artist.name],
+    [Artist.id],
+    Artist.seeking_venue
+  )
+  return api_response({
+    "artists": [{"id": artist_id, "name": name} for artist_id, name in rows],
+    "total": total,
+    "next_url": next_url
+  })
+
+@app.route('/api/v1/artists/<int:artist_id>')
+@replicas.read_only
+def api_artist(artist_id):
+  return api_response(artist_detail(artist_id))
+
+@app.route('/api/v1/shows')
+@replicas.read_only
+def api_shows():
+  query, page_size = shows_page()
+  data = []
+  for show_id, start_time, venue_id, venue_name, artist_id, artist_name, artist_image_link in query:
+    data.append({
+      "id": show_id,
+      "venue_id": venue_id,
+      "venue_name": venue_name,
+      "artist_id": artist_id,
+      "artist_name": artist_name,
+      "artist_image_link": artist_image_link,
+      "start_time": start_time
+    })
+  next_cursor = show_cursor(show_id, start_time) if len(data) == page_size else None
+  return api_response({"shows": data, "next_cursor": next_cursor})
+
+@app.route('/api/v1/search')
+@replicas.read_only
+def api_search():
+  # ?q=hop&type=venues|artists (both by default), paged with ?limit= / ?offset=
+  search_term = request.args.get('q', '')
+  kind = request.args.get('type')
+  if kind not in (None, 'venues', 'artists'):
+    return jsonify({'error': 'type must be venues or artists'}), 400
+  limit, offset = search_paging()
+  models = {'venues': Venue, 'artists': Artist}
+  if kind:
+    models = {kind: models[kind]}
+  # both searches run at the same time, each on its own pool thread and connection
+  futures = {name: in_app_context(search_by_name, model, search_term, limit, offset)
+             for name, model in models.items()}
+  return api_response({name: future.result() for name, future in futures.items()})
+
+def availability(model, show_fk, entity_id):
+  model.query.with_entities(model.id).filter(model.id == entity_id, model.deleted_at.is_(None)).first_or_404()
+  try:
+    start, end = parse_window(app.config['AVAILABILITY_DEFAULT_DAYS'])
+  except ValueError as e:
+    return jsonify({'error': str(e)}), 400
+  min_minutes = max(1, request.args.get('min_minutes', 60, type=int))
+  return api_response(free_slots(show_fk, entity_id, start, end, min_minutes))
+
+@app.route('/api/v1/venues/<int:venue_id>/availability')
+@replicas.read_only
+def api_venue_availability(venue_id):
+  # free slots: ?start=2026-11-01&end=2026-11-08&min_minutes=120
+  return availability(Venue, Show.venue_id, venue_id)
+
+@app.route('/api/v1/artists/<int:artist_id>/availability')
+@replicas.read_only
+def api_artist_availability(artist_id):
+  return availability(Artist, Show.artist_id, artist_id)
+
+@app.route('/api/v1/picker/venues')
+@replicas.read_only
+@conditional(lambda: listing_modified(Venue))
+@cache.cached('venues', mimetype='application/json')
+def api_pick_venue():
+  # the show form's venue picker: ?q=hop&after=<next_after of the previous page>
+  return api_body(picker_page(Venue, [Venue.id, Venue.name, Venue.city, Venue.state])).decode('utf-8')
+
+@app.route('/api/v1/picker/artists')
+@replicas.read_only
+@conditional(lambda: listing_modified(Artist))
+@cache.cached('artists', mimetype='application/json')
+def api_pick_artist():
+  return api_body(picker_page(Artist, [Artist.id, Artist.name, Artist.city, Artist.state])).decode('utf-8')
+
+@app.route('/api/v1/suggest')
+@replicas.read_only
+def api_suggest():
+  # typeahead: ?q=mus&type=venues|artists (both by default)&limit=, answered from memory
+  # (empty for the few moments after a worker starts, until the first rebuild is in)
+  kind = request.args.get('type')
+  if kind not in (None, 'venues', 'artists'):
+    return jsonify({'error': 'type must be venues or artists'}), 400
+  limit = request.args.get('limit', app.config['SUGGEST_LIMIT'], type=int)
+  limit = max(1, min(limit, app.config['SUGGEST_MAX_LIMIT']))
+  matches = suggestions.lookup(request.args.get('q', ''), (kind,) if kind else ('venues', 'artists'), limit)
+  return api_response({"suggestions": matches})
+
 @app.errorhandler(404)
 def not_found_error(error):
+  if request.path.startswith('/api/'):
+    return jsonify({'error': 'not found'}), 404
   return render_template('errors/404.html'), 404
 
 @app.errorhandler(500)
@@ -628,6 +1619,101 @@ if not app.debug:
   app.logger.addHandler(file_handler)
   app.logger.info('errors')
 
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+@app.cli.command('check-db')
+def check_db():
+  """Check the database connection."""
+  try:
+    version_str, dbname = database_status()
+  except Exception as e:
+    click.echo(f"Oops... Database connection failed: {e}")
+    raise SystemExit(1)
+  click.echo(f"\nYESSSSS! Database connection successful.\nPostgreSQL version: {version_str}\n The Database name: {dbname}\n")
+
+counters_cli = AppGroup('counters', help='Maintain the denormalized upcoming show counters.')
+
+@counters_cli.command('roll')
+@click.option('--window', default=60, show_default=True,
+              help='Minutes to look back; schedule the job at least this often.')
+def roll_counters(window):
+  """Recount venues and artists whose shows moved from upcoming to past."""
+  now = datetime.utcnow()
+  since = now - timedelta(minutes=window)
+  for model, show_fk in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    ids = db.session.query(show_fk).filter(Show.start_time >= since, Show.start_time < now).distinct()
+    updated = recompute_upcoming_counts(model, show_fk, now, ids)
+    click.echo(f'{model.__name__}: recounted {updated} rows')
+  db.session.commit()
+  if app.config['VENUE_AREAS_FROM_SUMMARY']:
+    refresh_area_summary()
+
+@counters_cli.command('check')
+@click.option('--fix', is_flag=True, help='Reset every drifted counter to the live count.')
+def check_counters(fix):
+  """Recompute every counter from the Show table and report drift."""
+  now = datetime.utcnow()
+  drifted = 0
+  for model, show_fk in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    live = live_upcoming_count(model, show_fk, now)
+    # soft deleted rows keep whatever they had, nobody reads them
+    rows = db.session.query(model.id, model.num_upcoming_shows, live).filter(
+      model.deleted_at.is_(None), model.num_upcoming_shows != live
+    ).order_by(model.id).all()
+    for entity_id, stored, actual in rows:
+      click.echo(f'{model.__name__} {entity_id}: stored {stored}, actual {actual}')
+    drifted += len(rows)
+    if fix and rows:
+      recompute_upcoming_counts(model, show_fk, now, [entity_id for entity_id, stored, actual in rows])
+  if fix:
+    db.session.commit()
+  click.echo(f'{drifted} drifted counters' + (' fixed' if fix and drifted else ''))
+  if drifted and not fix:
+    raise SystemExit(1)
+
+@app.cli.command('purge')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows deleted per transaction.')
+@click.option('--older-than', default=0, show_default=True, help='Only venues / artists deleted at least this many hours ago.')
+def purge(batch_size, older_than):
+  """Remove soft deleted venues and artists, and their shows, in bounded batches."""
+  cutoff = datetime.utcnow() - timedelta(hours=older_than)
+  deleted_venues = db.session.query(Venue.id).filter(Venue.deleted_at <= cutoff)
+  deleted_artists = db.session.query(Artist.id).filter(Artist.deleted_at <= cutoff)
+  # shows first, so the final venue / artist deletes have nothing left to cascade to.
+  # the counters already let go of these shows when their venue / artist was deleted
+  for label, model, criteria in (
+    ('shows', Show, db.or_(Show.venue_id.in_(deleted_venues.subquery()), Show.artist_id.in_(deleted_artists.subquery()))),
+    ('venues', Venue, Venue.id.in_(deleted_venues.subquery())),
+    ('artists', Artist, Artist.id.in_(deleted_artists.subquery())),
+  ):
+    total = 0
+    while True:
+      batch = db.session.query(model.id).filter(criteria).limit(batch_size).subquery()
+      count = model.query.filter(model.id.in_(batch)).delete(synchronize_session=False)
+      db.session.commit()
+      total += count
+      if count < batch_size:
+        break
+    click.echo(f'purged {total} {label}')
+
+areas_cli = AppGroup('areas', help='Maintain the /venues area summary view.')
+
+@areas_cli.command('refresh')
+def refresh_areas():
+  """Refresh venue_area_summary (run from cron, e.g. every 5 minutes)."""
+  start = datetime.utcnow()
+  refresh_area_summary()
+  click.echo(f'venue_area_summary refreshed in {(datetime.utcnow() - start).total_seconds():.2f}s')
+
+app.cli.add_command(counters_cli)
+app.cli.add_command(areas_cli)
+app.cli.add_command(bulk_cli)
+app.cli.add_command(assets_cli)
+app.cli.add_command(templates_cli)
+app.cli.add_command(seed_command)
+
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
@@ -0,0 +1,112 @@
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#   flask assets build
+# Concatenates the stylesheets / scripts the layouts load into one file per
+# bundle under static/build/, named after a hash of its content
+# (main.3f9c2a1b0d.css), and writes static/build/manifest.json. Once the
+# manifest exists the layouts link the bundles, which are served with a one
+# year immutable Cache-Control: a changed file gets a new name, so browsers
+# never need to revalidate them. Without a build (development) the layouts
+# link the source files one by one, as before.
+#----------------------------------------------------------------------------#
+
+import hashlib
+import json
+import os
+
+import click
+from flask import request, url_for
+from flask.cli import AppGroup
+
+BUILD_DIR = 'build'
+# bundle name -> source files under static/. build/ sits next to css/, so relative
+# url(../fonts/...) references in the stylesheets still resolve
+BUNDLES = {
+  'main.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+               'css/main.responsive.css', 'css/main.quickfix.css'],
+  'form.css': ['css/bootstrap.min.css', 'css/bootstrap-theme.min.css', 'css/layout.main.css',
+               'css/main.css', 'css/main.responsive.css', 'css/main.quickfix.css'],
+  # loaded in <head>, before the page renders
+  'head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+  # deferred, after jQuery
+  'main.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js'],
+}
+
+
+class AssetManifest:
+  def __init__(self, app=None):
+    self.bundles = {}
+    self.version = None
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    self.static_folder = app.static_folder
+    self.max_age = app.config.get('ASSET_MAX_AGE', 365 * 24 * 3600)
+    self.load()
+    app.add_template_global(self.asset_urls)
+    app.after_request(self.after_request)
+
+  @property
+  def manifest_path(self):
+    return os.path.join(self.static_folder, BUILD_DIR, 'manifest.json')
+
+  def load(self):
+    # bundle name -> built file, plus a version that changes with any bundle (part of page ETags)
+    try:
+      with open(self.manifest_path) as f:
+        self.bundles = json.load(f)
+    except FileNotFoundError:
+      self.bundles = {}
+    self.version = hashlib.sha1(json.dumps(self.bundles, sort_keys=True).encode()).hexdigest()[:10] if self.bundles else None
+
+  def asset_urls(self, bundle):
+    # the URLs a layout links for `bundle`: the built file, or the sources before a build
+    if bundle in self.bundles:
+      return [url_for('static', filename=self.bundles[bundle])]
+    return [url_for('static', filename=source) for source in BUNDLES[bundle]]
+
+  def after_request(self, response):
+    if request.endpoint == 'static' and (request.view_args or {}).get('filename', '').startswith(BUILD_DIR + '/'):
+      response.cache_control.public = True
+      response.cache_control.max_age = self.max_age
+      response.cache_control.immutable = True
+      response.cache_control.no_cache = None
+    return response
+
+  def build(self):
+    # writes every bundle and the manifest, returns {bundle: built file}. Earlier builds stay
+    # on disk, pages cached before a deploy may still link them
+    out_dir = os.path.join(self.static_folder, BUILD_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    built = {}
+    for bundle, sources in BUNDLES.items():
+      name, ext = os.path.splitext(bundle)
+      # a script missing its final semicolon must not run into the next one
+      separator = b'\n;\n' if ext == '.js' else b'\n'
+      parts = []
+      for source in sources:
+        with open(os.path.join(self.static_folder, source), 'rb') as f:
+          parts.append(f.read())
+      content = separator.join(parts)
+      filename = f'{name}.{hashlib.sha256(content).hexdigest()[:10]}{ext}'
+      with open(os.path.join(out_dir, filename), 'wb') as f:
+        f.write(content)
+      built[bundle] = f'{BUILD_DIR}/{filename}'
+    with open(self.manifest_path, 'w') as f:
+      json.dump(built, f, indent=2, sort_keys=True)
+    self.load()
+    return built
+
+
+assets_cli = AppGroup('assets', help='Build the fingerprinted static bundles.')
+
+
+@assets_cli.command('build')
+def build_command():
+  """Bundle and fingerprint the layout's CSS / JS into static/build/."""
+  from app import assets, cache
+  for bundle, filename in assets.build().items():
+    click.echo(f'{bundle} -> {filename}')
+  # cached pages still link the old files
+  cache.clear()
@@ -0,0 +1,525 @@
+#----------------------------------------------------------------------------#
+# Benchmarks.
+#   python bench.py search --rows 10000 100000 1000000
+#   python bench.py explain --shows 100000
+#   python bench.py queries --venues 100 2000
+#   python bench.py datetime
+#   python bench.py suggest --rows 100000
+#   python bench.py memory --rows 100000
+#   python bench.py validate --rows 20000
+#   python bench.py routes --save bench_baseline.json
+#   python bench.py routes --compare bench_baseline.json
+# NOTE: these insert synthetic rows, so they only run against a scratch database given in
+# BENCH_DATABASE_URL (never the DATABASE_URL the app uses).
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import babel.dates
+import dateutil.parser
+
+from sqlalchemy import event
+from werkzeug.datastructures import MultiDict
+
+if not os.environ.get('BENCH_DATABASE_URL'):
+  sys.exit('bench.py writes synthetic rows: set BENCH_DATABASE_URL to a scratch database')
+# config.py reads DATABASE_URL when app is imported
+os.environ['DATABASE_URL'] = os.environ['BENCH_DATABASE_URL']
+
+from app import app, db, cache, Venue, Artist, Show, search_by_name, format_datetime, suggestions, rebuild_suggestions, refresh_area_summary, SUGGESTION_THREAD
+from seed import seed, venue_row, artist_row
+from forms import VenueForm, ArtistForm, ShowForm, validate_venue, validate_artist, validate_show
+
+SEARCH_TERMS = ['a', 'hop', 'music', '3f9']
+
+def timed(fn, repeat):
+  # median wall time in milliseconds over `repeat` runs
+  samples = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn()
+    samples.append((time.perf_counter() - start) * 1000)
+  return statistics.median(samples)
+
+def top_up(model, rows):
+  # fills the table up to `rows` rows with random looking names straight in SQL
+  existing = model.query.count()
+  if existing < rows:
+    db.session.execute(db.text(f'''
+      INSERT INTO "{model.__tablename__}" (name, city, state, genres)
+      SELECT 'bench ' || md5(i::text), 'San Francisco', 'CA', ARRAY['Jazz']
+      FROM generate_series(1, :missing) AS i
+    '''), {'missing': rows - existing})
+    db.session.execute(db.text(f'ANALYZE "{model.__tablename__}"'))
+    db.session.commit()
+
+def ensure_shows(rows):
+  # seeds synthetic venues / artists / shows until there are at least `rows` shows
+  missing = rows - Show.query.count()
+  if missing > 0:
+    seed(venues=max(1, missing // 10), artists=max(1, missing // 10), shows=missing)
+
+def from_requests(listener):
+  # engine events fire on every thread: leave out the suggestion index rebuilds the first
+  # request starts in the background, they'd be counted against whatever route runs meanwhile
+  def wrapper(*args):
+    if threading.current_thread().name != SUGGESTION_THREAD:
+      listener(*args)
+  return wrapper
+
+def ensure_areas(areas):
+  # the seed data only has a few dozen (city, state) areas, a summary view that small is
+  # always read whole. Enough of them that the keyset pages plan like a real one
+  existing = db.session.execute(db.text('SELECT count(*) FROM venue_area_summary')).scalar()
+  if existing < areas:
+    db.session.execute(db.text('''
+      INSERT INTO "Venue" (name, city, state, genres)
+      SELECT 'bench area ' || i, 'Bench City ' || i, 'WA', ARRAY['Jazz']
+      FROM generate_series(1, :missing) AS i
+    '''), {'missing': areas - existing})
+    db.session.commit()
+    refresh_area_summary()
+  db.session.execute(db.text('ANALYZE venue_area_summary'))
+  db.session.commit()
+
+def bench_search(args):
+  print(f"{'rows':>9} {'model':>7} {'term':>6} {'seq scan ms':>12} {'trigram ms':>11}")
+  for rows in args.rows:
+    for model in (Venue, Artist):
+      top_up(model, rows)
+      for term in SEARCH_TERMS:
+        def old():
+          # the old search: unbounded ilike with the index switched off
+          db.session.execute(db.text('SET LOCAL enable_bitmapscan = off'))
+          model.query.filter(model.name.ilike(f'%{term}%')).all()
+          db.session.rollback()
+        def new():
+          search_by_name(model, term, app.config['SEARCH_RESULTS_LIMIT'], 0)
+          db.session.rollback()
+        print(f'{rows:>9} {model.__name__:>7} {term:>6} {timed(old, args.repeat):>12.1f} {timed(new, args.repeat):>11.1f}')
+
+# every listing / search / detail route, with the tables it may legitimately read in full
+# (the unfiltered first pages of /venues and /artists count every row)
+EXPLAIN_ROUTES = [
+  # the first page sums the totals over the (small, one row per area) summary view
+  ('GET', '/venues', {}, {'venue_area_summary'}),
+  ('GET', '/venues?areas_after=%5B%22Madison%22%2C%22WA%22%5D&total=1', {}, set()),
+  ('GET', '/venues?genre=Jazz&genre=Blues&genre_match=all', {}, set()),
+  ('GET', '/artists', {}, {'Artist'}),
+  ('GET', '/artists?genre=Folk&state=CA', {}, set()),
+  ('POST', '/venues/search', {'search_term': 'hop'}, set()),
+  ('POST', '/artists/search', {'search_term': 'hop'}, set()),
+  ('GET', '/venues/1', {}, set()),
+  ('GET', '/artists/1', {}, set()),
+  ('GET', '/shows', {}, set()),
+  ('GET', '/shows.json', {}, set()),
+  ('GET', '/api/v1/venues/1/availability', {}, set()),
+  ('GET', '/api/v1/picker/venues', {}, set()),
+  ('GET', '/api/v1/picker/artists?q=hop', {}, set()),
+]
+
+def bench_explain(args):
+  # runs every route, EXPLAINs each SELECT it issued and fails on sequential scans
+  ensure_shows(args.shows)
+  ensure_areas(args.areas)
+
+  statements = []
+  @from_requests
+  def capture(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith('SELECT'):
+      statements.append((statement, parameters))
+
+  client = app.test_client()
+  failed = False
+  for method, path, form, allowed in EXPLAIN_ROUTES:
+    statements.clear()
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+      client.open(path, method=method, data=form).get_data()
+    finally:
+      event.remove(db.engine, 'before_cursor_execute', capture)
+    for statement, parameters in statements:
+      raw = db.engine.raw_connection()
+      try:
+        cursor = raw.cursor()
+        cursor.execute('EXPLAIN ' + statement, parameters)
+        plan = '\n'.join(line for line, in cursor.fetchall())
+      finally:
+        raw.close()
+      scans = {line.split(' on ')[1].split()[0].strip('"') for line in plan.splitlines() if 'Seq Scan on' in line}
+      bad = scans - allowed
+      print(f"{'FAIL' if bad else 'ok':>4} {method} {path}: {', '.join(sorted(scans)) or 'no seq scans'}")
+      if bad:
+        failed = True
+        print(plan)
+  if failed:
+    sys.exit(1)
+
+def bench_queries(args):
+  # /venues must issue the same number of statements however many venues there are
+  # (no query per area / per venue). Exits 1 if the count moves between sizes
+  cache.backend = None
+  client = app.test_client(use_cookies=False)
+  statements = [0]
+  @from_requests
+  def count(conn, cursor, statement, parameters, context, executemany):
+    statements[0] += 1
+  paths = (('summary', True, '/venues'), ('live', False, '/venues'), ('genre filter', True, '/venues?genre=Jazz'))
+  counts = {}
+  summary_setting = app.config['VENUE_AREAS_FROM_SUMMARY']
+  try:
+    for size in sorted(args.venues):
+      missing = size - Venue.query.count()
+      if missing > 0:
+        seed(venues=missing, artists=0, shows=0)
+      refresh_area_summary()
+      db.session.remove()
+      for name, from_summary, path in paths:
+        app.config['VENUE_AREAS_FROM_SUMMARY'] = from_summary
+        statements[0] = 0
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+          response = client.get(path)
+        finally:
+          event.remove(db.engine, 'before_cursor_execute', count)
+        if response.status_code != 200:
+          print(f'{name}: {path} returned {response.status_code}', file=sys.stderr)
+          sys.exit(1)
+        counts.setdefault(name, {})[size] = statements[0]
+  finally:
+    app.config['VENUE_AREAS_FROM_SUMMARY'] = summary_setting
+
+  failed = False
+  for name, by_size in counts.items():
+    print(f"{name:<13} " + '  '.join(f'{size} venues: {n} statements' for size, n in by_size.items()))
+    if len(set(by_size.values())) > 1:
+      print(f'{name}: statement count grows with the number of venues', file=sys.stderr)
+      failed = True
+  if failed:
+    sys.exit(1)
+
+def bench_datetime(args):
+  # per call cost of the `datetime` template filter over a page worth of show times
+  now = datetime.utcnow()
+  rnd = random.Random(0)
+  values = [now + timedelta(hours=rnd.randint(0, args.distinct)) for _ in range(args.calls)]
+  strings = [value.strftime("%Y-%m-%dT%H:%M:%S.%fZ") for value in values]
+
+  def old():
+    # what the filter used to do: re-parse the view's string and the babel pattern every call
+    for value in strings:
+      babel.dates.format_datetime(dateutil.parser.parse(value), "EEEE MMMM, d, y 'at' h:mma", locale='en')
+  def new():
+    format_datetime.cache_clear()
+    for value in values:
+      format_datetime(value, 'full')
+
+  for name, fn in (('old', old), ('new', new)):
+    per_call = timed(fn, args.repeat) * 1000 / args.calls
+    print(f'{name}: {per_call:.1f} us per call ({args.calls} calls, {args.distinct} distinct times)')
+
+def bench_suggest(args):
+  # typeahead from the in-memory prefix index vs an ilike search per keystroke
+  for model in (Venue, Artist):
+    top_up(model, args.rows)
+  start = time.perf_counter()
+  rebuild_suggestions()
+  index = suggestions
+  print(f'index built in {(time.perf_counter() - start) * 1000:.0f} ms: {index.stats()}')
+  rnd = random.Random(0)
+  # what a user types: 1 to 4 characters of a real name
+  names = [name for name, in db.session.query(Venue.name).limit(1000)]
+  prefixes = [name[:rnd.randint(1, 4)] for name in rnd.choices(names, k=args.calls)]
+
+  def ilike():
+    for prefix in prefixes:
+      search_by_name(Venue, prefix, 10, 0)
+      search_by_name(Artist, prefix, 10, 0)
+  def prefix_index():
+    for prefix in prefixes:
+      index.lookup(prefix, limit=10)
+
+  for name, fn in (('ilike', ilike), ('prefix index', prefix_index)):
+    per_call = timed(fn, args.repeat) * 1000 / args.calls
+    print(f'{name}: {per_call:.1f} us per lookup ({args.calls} lookups, {args.rows} rows per table)')
+
+def percentile(samples, p):
+  ordered = sorted(samples)
+  return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def route_scenarios(rnd):
+  # (name, request builder) for every route; builders return (method, path, form data)
+  venue_ids = [i for i, in db.session.query(Venue.id).order_by(db.func.random()).limit(200)]
+  artist_ids = [i for i, in db.session.query(Artist.id).order_by(db.func.random()).limit(200)]
+  created = []
+  def venue_form(name):
+    return {'name': name, 'city': 'Springfield', 'state': 'IL', 'address': '1 Main St',
+            'phone': '217-555-0100', 'genres': ['Jazz', 'Blues'], 'facebook_link': 'https://www.facebook.com/bench'}
+  def artist_form(name):
+    return {'name': name, 'city': 'Springfield', 'state': 'IL', 'phone': '217-555-0100',
+            'genres': ['Jazz'], 'facebook_link': 'https://www.facebook.com/bench'}
+  def create_venue():
+    name = f'Bench venue {rnd.getrandbits(48):x}'
+    created.append(name)
+    return 'POST', '/venues/create', venue_form(name)
+  def delete_venue():
+    venue_id = db.session.query(Venue.id).filter(Venue.name == created.pop()).scalar() if created else 0
+    db.session.remove()
+    return 'DELETE', f'/venues/{venue_id}', None
+  start_time = lambda: (datetime.utcnow() + timedelta(days=rnd.randint(1, 300))).strftime('%Y-%m-%d %H:%M:%S')
+  search_terms = ['the', 'room', 'band', 'velvet', 'matt']
+  return [
+    ('GET /venues', lambda: ('GET', '/venues', None)),
+    ('GET /artists', lambda: ('GET', '/artists', None)),
+    ('GET /shows', lambda: ('GET', '/shows', None)),
+    ('GET /shows.json', lambda: ('GET', '/shows.json', None)),
+    ('POST /venues/search', lambda: ('POST', '/venues/search', {'search_term': rnd.choice(search_terms)})),
+    ('POST /artists/search', lambda: ('POST', '/artists/search', {'search_term': rnd.choice(search_terms)})),
+    ('GET /venues/<id>', lambda: ('GET', f'/venues/{rnd.choice(venue_ids)}', None)),
+    ('GET /artists/<id>', lambda: ('GET', f'/artists/{rnd.choice(artist_ids)}', None)),
+    ('GET /api/v1/suggest', lambda: ('GET', f'/api/v1/suggest?q={rnd.choice(search_terms)[:3]}', None)),
+    ('POST /venues/create', create_venue),
+    ('POST /artists/create', lambda: ('POST', '/artists/create', artist_form(f'Bench artist {rnd.getrandbits(48):x}'))),
+    ('POST /shows/create', lambda: ('POST', '/shows/create', {
+      'venue_id': str(rnd.choice(venue_ids)), 'artist_id': str(rnd.choice(artist_ids)), 'start_time': start_time()})),
+    ('GET /venues/<id>/edit', lambda: ('GET', f'/venues/{rnd.choice(venue_ids)}/edit', None)),
+    ('POST /venues/<id>/edit', lambda: ('POST', f'/venues/{rnd.choice(venue_ids)}/edit', venue_form('Bench edited venue'))),
+    ('GET /artists/<id>/edit', lambda: ('GET', f'/artists/{rnd.choice(artist_ids)}/edit', None)),
+    ('POST /artists/<id>/edit', lambda: ('POST', f'/artists/{rnd.choice(artist_ids)}/edit', artist_form('Bench edited artist'))),
+    ('DELETE /venues/<id>', delete_venue),
+  ]
+
+def bench_routes(args):
+  # drives every route through the test client; p50/p95/p99 latency and queries per request
+  if args.no_cache:
+    cache.backend = None
+  ensure_shows(args.shows)
+  rnd = random.Random(args.random_seed)
+  queries = [0]
+  @from_requests
+  def count(conn, cursor, statement, parameters, context, executemany):
+    queries[0] += 1
+
+  # no cookies: flash messages from the write routes would otherwise bypass the page cache
+  client = app.test_client(use_cookies=False)
+  results = {}
+  for name, build in route_scenarios(rnd):
+    latencies, counts = [], []
+    for _ in range(args.requests):
+      method, path, data = build()
+      queries[0] = 0
+      event.listen(db.engine, 'before_cursor_execute', count)
+      start = time.perf_counter()
+      try:
+        response = client.open(path, method=method, data=data)
+        response.get_data()
+      finally:
+        latencies.append((time.perf_counter() - start) * 1000)
+        event.remove(db.engine, 'before_cursor_execute', count)
+      counts.append(queries[0])
+      if response.status_code >= 500:
+        print(f'{name}: {path} returned {response.status_code}', file=sys.stderr)
+    results[name] = {
+      'p50_ms': round(percentile(latencies, 50), 2),
+      'p95_ms': round(percentile(latencies, 95), 2),
+      'p99_ms': round(percentile(latencies, 99), 2),
+      'queries': round(statistics.mean(counts), 2),
+    }
+
+  baseline = {}
+  if args.compare and not os.path.exists(args.compare):
+    print(f'no baseline at {args.compare} yet (create one with --save), nothing to compare', file=sys.stderr)
+  elif args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)['routes']
+  print(f"{'route':<26} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+  regressions = []
+  for name, r in results.items():
+    line = f"{name:<26} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['queries']:>8.1f}"
+    old = baseline.get(name)
+    if old:
+      line += f"   (baseline p95 {old['p95_ms']:.1f}, queries {old['queries']:.1f})"
+      slower = r['p95_ms'] > old['p95_ms'] * (1 + args.tolerance) and r['p95_ms'] - old['p95_ms'] > args.min_delta
+      if slower or r['queries'] > old['queries']:
+        regressions.append(name)
+        line += '  REGRESSION'
+    print(line)
+
+  if args.save:
+    with open(args.save, 'w') as f:
+      json.dump({'shows': args.shows, 'requests': args.requests, 'routes': results}, f, indent=2, sort_keys=True)
+    print(f'saved {args.save}')
+  if regressions:
+    print(f"{len(regressions)} routes regressed: {', '.join(regressions)}")
+    sys.exit(1)
+
+def peak_kib(fn):
+  # tracemalloc peak while fn runs, in KiB (starts from an empty session every time)
+  db.session.remove()
+  tracemalloc.start()
+  try:
+    fn()
+    return tracemalloc.get_traced_memory()[1] / 1024
+  finally:
+    tracemalloc.stop()
+    db.session.remove()
+
+def bench_memory(args):
+  # full ORM hydration vs column projections, then the per request peak of the read routes
+  if args.no_cache:
+    cache.backend = None
+  ensure_shows(args.rows)
+  for model in (Venue, Artist):
+    top_up(model, args.rows)
+  limit = args.rows
+  loads = [
+    ('artists: entities', lambda: Artist.query.limit(limit).all()),
+    ('artists: id, name', lambda: db.session.query(Artist.id, Artist.name).limit(limit).all()),
+    ('venues: entities', lambda: Venue.query.limit(limit).all()),
+    ('venues: id, name, city, state', lambda: db.session.query(Venue.id, Venue.name, Venue.city, Venue.state).limit(limit).all()),
+    ('shows: show + venue + artist', lambda: db.session.query(Show, Venue, Artist).join(
+      Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id).limit(limit).all()),
+    ('shows: rendered columns', lambda: db.session.query(
+      Show.start_time, Venue.id, Venue.name, Artist.id, Artist.name, Artist.image_link
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id).limit(limit).all()),
+  ]
+  print(f"{'load ' + str(limit) + ' rows':<34} {'peak KiB':>10}")
+  for name, fn in loads:
+    print(f'{name:<34} {peak_kib(fn):>10.0f}')
+
+  client = app.test_client(use_cookies=False)
+  rnd = random.Random(0)
+  print(f"\n{'route':<26} {'median peak KiB':>16} {'max peak KiB':>13}")
+  for name, build in route_scenarios(rnd):
+    method = name.split()[0]
+    if method != 'GET' and 'search' not in name:
+      continue
+    peaks = []
+    for _ in range(args.requests):
+      method, path, data = build()
+      peaks.append(peak_kib(lambda: client.open(path, method=method, data=data).get_data()))
+    print(f'{name:<26} {statistics.median(peaks):>16.0f} {max(peaks):>13.0f}')
+
+def formdata(row):
+  # a plain row as the create page would post it
+  data = MultiDict()
+  for field, value in row.items():
+    if value in (None, '', False):
+      continue
+    for item in (value if isinstance(value, list) else [value]):
+      data.add(field, 'y' if item is True else str(item))
+  return data
+
+def bench_validate(args):
+  # rows validated per second: a WTForms form per row vs the form-free validators
+  rnd = random.Random(0)
+  def broken(row):
+    # every tenth row has a bad state / phone / genre
+    if rnd.random() < 0.1:
+      row[rnd.choice(['state', 'phone', 'genres'])] = rnd.choice(['XX', '12345', ['Polka']])
+    return row
+  start = datetime(2027, 1, 1, 18)
+  def show_row():
+    # every fifth start time comes as ISO 8601 with an offset (a partner feed), the form
+    # gets the same moment in UTC the way the create page posts it
+    moment = start + timedelta(hours=rnd.randint(0, 10000))
+    row = {'venue_id': rnd.randint(1, 1000), 'artist_id': rnd.randint(1, 1000), 'duration': 120,
+           'start_time': moment.strftime('%Y-%m-%d %H:%M:%S')}
+    if rnd.random() < 0.2:
+      offset = timezone(timedelta(minutes=rnd.choice([-300, -210, 0, 60, 120, 330])))
+      row['start_time'] = moment.replace(tzinfo=timezone.utc).astimezone(offset).isoformat()
+      return row, dict(row, start_time=moment.strftime('%Y-%m-%d %H:%M:%S'))
+    return row, row
+  shows = [show_row() for _ in range(args.rows)]
+  venues = [broken(venue_row(rnd)) for _ in range(args.rows)]
+  artists = [broken(artist_row(rnd)) for _ in range(args.rows)]
+  # (kind, form, validator, rows, rows as the form would get them)
+  kinds = [
+    ('venues', VenueForm, validate_venue, venues, venues),
+    ('artists', ArtistForm, validate_artist, artists, artists),
+    ('shows', ShowForm, validate_show, [row for row, _ in shows], [form_row for _, form_row in shows]),
+  ]
+  print(f"{'kind':<8} {'WTForms rows/s':>15} {'form-free rows/s':>17} {'disagreements':>14}")
+  with app.test_request_context():
+    for kind, form_class, validate, rows, form_rows in kinds:
+      posted = [formdata(row) for row in form_rows]
+      def with_forms():
+        return [form_class(formdata=data, meta={'csrf': False}).validate() for data in posted]
+      def form_free():
+        return [validate(row)[1] is None for row in rows]
+      disagreements = sum(a != b for a, b in zip(with_forms(), form_free()))
+      if kind == 'shows':
+        # and both must land on the same UTC start time
+        for data, row in zip(posted, rows):
+          form, (clean, errors) = form_class(formdata=data, meta={'csrf': False}), validate(row)
+          disagreements += bool(form.validate() and clean and clean['start_time'] != form.start_time.data)
+      per_second = [args.rows / timed(fn, args.repeat) * 1000 for fn in (with_forms, form_free)]
+      print(f'{kind:<8} {per_second[0]:>15.0f} {per_second[1]:>17.0f} {disagreements:>14}')
+
+def main():
+  parser = argparse.ArgumentParser(description='Fyyur benchmarks (run against a scratch database)')
+  sub = parser.add_subparsers(dest='command', required=True)
+
+  search = sub.add_parser('search', help='old ilike search vs the trigram indexed search')
+  search.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+  search.add_argument('--repeat', type=int, default=5)
+  search.set_defaults(func=bench_search)
+
+  explain = sub.add_parser('explain', help='fail if a listing/search/detail query sequentially scans')
+  explain.add_argument('--shows', type=int, default=100000)
+  explain.add_argument('--areas', type=int, default=2000)
+  explain.set_defaults(func=bench_explain)
+
+  queries = sub.add_parser('queries', help='fail if /venues issues more statements as venues grow')
+  queries.add_argument('--venues', type=int, nargs=2, default=[100, 2000], metavar=('SMALL', 'LARGE'))
+  queries.set_defaults(func=bench_queries)
+
+  dt = sub.add_parser('datetime', help='per call cost of the datetime template filter')
+  dt.add_argument('--calls', type=int, default=1000)
+  dt.add_argument('--distinct', type=int, default=200)
+  dt.add_argument('--repeat', type=int, default=5)
+  dt.set_defaults(func=bench_datetime)
+
+  suggest = sub.add_parser('suggest', help='typeahead prefix index vs ilike search')
+  suggest.add_argument('--rows', type=int, default=100000)
+  suggest.add_argument('--calls', type=int, default=200)
+  suggest.add_argument('--repeat', type=int, default=3)
+  suggest.set_defaults(func=bench_suggest)
+
+  memory = sub.add_parser('memory', help='tracemalloc peak of entity vs projection loads and per read route')
+  memory.add_argument('--rows', type=int, default=100000)
+  memory.add_argument('--requests', type=int, default=20, help='requests per route')
+  memory.add_argument('--no-cache', action='store_true', help='bypass the page cache')
+  memory.set_defaults(func=bench_memory)
+
+  validate = sub.add_parser('validate', help='rows validated per second, WTForms vs the form-free validators')
+  validate.add_argument('--rows', type=int, default=20000)
+  validate.add_argument('--repeat', type=int, default=3)
+  validate.set_defaults(func=bench_validate)
+
+  routes = sub.add_parser('routes', help='latency percentiles and queries per request for every route')
+  routes.add_argument('--shows', type=int, default=10000, help='seed up to this many shows first')
+  routes.add_argument('--requests', type=int, default=50, help='requests per route')
+  routes.add_argument('--no-cache', action='store_true', help='bypass the page cache')
+  routes.add_argument('--random-seed', type=int, default=0)
+  routes.add_argument('--save', help='write the results as a JSON baseline')
+  routes.add_argument('--compare', help='diff against a saved baseline, exit 1 on regressions')
+  routes.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 slow down (0.2 = 20%%)')
+  routes.add_argument('--min-delta', type=float, default=2.0, help='ignore p95 slow downs under this many ms')
+  routes.set_defaults(func=bench_routes)
+
+  args = parser.parse_args()
+  with app.app_context():
+    args.func(args)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,233 @@
+#----------------------------------------------------------------------------#
+# Bulk import / export.
+#   flask bulk import venues venues.csv --batch-size 5000
+#   flask bulk export shows shows.ndjson
+# Rows go through the same VenueForm / ArtistForm / ShowForm rules as the
+# create pages and are written with COPY, one transaction per batch. Show
+# start times may carry an offset ("2027-03-01T18:00:00+02:00", "...Z"),
+# they are stored in UTC like every other show; without one they are taken
+# to be UTC already, which is also what the export writes. A
+# checkpoint file next to the input records how far we got, so an
+# interrupted import picks up where it stopped.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import os
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+
+from forms import VENUE_FIELDS, ARTIST_FIELDS, validate_venue, validate_artist, validate_show
+
+FIELDS = {
+  'venues': list(VENUE_FIELDS),
+  'artists': list(ARTIST_FIELDS),
+  'shows': ['venue_id', 'artist_id', 'start_time', 'duration'],
+}
+# form-free validation: same rules as the create forms, without a WTForms form per row
+VALIDATORS = {'venues': validate_venue, 'artists': validate_artist, 'shows': validate_show}
+# genres in a CSV cell are separated by semicolons: "Jazz;Rock n Roll"
+GENRE_SEPARATOR = ';'
+
+bulk_cli = AppGroup('bulk', help='Bulk import / export venues, artists and shows.')
+
+
+def models():
+  # imported lazily: app.py imports this module to register the commands
+  from app import Venue, Artist, Show
+  return {'venues': Venue, 'artists': Artist, 'shows': Show}
+
+
+def file_format(path, fmt):
+  if fmt:
+    return fmt
+  return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def read_rows(path, fmt):
+  with open(path, newline='', encoding='utf-8') as f:
+    if fmt == 'csv':
+      for row in csv.DictReader(f):
+        if row.get('genres') is not None:
+          row['genres'] = [g.strip() for g in row['genres'].split(GENRE_SEPARATOR) if g.strip()]
+        yield row
+    else:
+      for line in f:
+        if line.strip():
+          yield json.loads(line)
+
+
+def validate(kind, row):
+  # returns (clean values, None) or (None, errors)
+  return VALIDATORS[kind](row)
+
+
+def pg_array(values):
+  # text[] literal for COPY: {"Jazz","Rock n Roll"}
+  return '{' + ','.join('"' + v.replace('\\', '\\\\').replace('"', '\\"') + '"' for v in values) + '}'
+
+
+def copy_rows(model, columns, rows, skip_conflicts=False):
+  # with skip_conflicts the rows are COPYed into a scratch table and moved over with
+  # INSERT ... ON CONFLICT DO NOTHING, so rows breaking a unique / exclusion constraint
+  # (double booked shows) are dropped instead of failing the batch. Returns the rows
+  # that went in, as tuples of `columns`
+  from app import db
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  for row in rows:
+    writer.writerow([pg_array(row[c]) if c == 'genres' else row[c] for c in columns])
+  buffer.seek(0)
+  cursor = db.session.connection().connection.cursor()
+  table = f'"{model.__tablename__}"'
+  column_list = ', '.join(f'"{c}"' for c in columns)
+  if not skip_conflicts:
+    cursor.copy_expert(f'COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+    return None
+  cursor.execute('DROP TABLE IF EXISTS bulk_staging')
+  cursor.execute(f'CREATE TEMP TABLE bulk_staging ON COMMIT DROP AS SELECT {column_list} FROM {table} WITH NO DATA')
+  cursor.copy_expert(f'COPY bulk_staging ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+  cursor.execute(f'INSERT INTO {table} ({column_list}) SELECT {column_list} FROM bulk_staging '
+                 f'ON CONFLICT DO NOTHING RETURNING {column_list}')
+  return cursor.fetchall()
+
+
+def missing_references(batch):
+  # shows pointing at venues / artists that don't exist, found with one query per side
+  from app import db, Venue, Artist
+  missing = set()
+  for model, key in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+    wanted = {clean[key] for line, row, clean in batch}
+    found = {entity_id for entity_id, in db.session.query(model.id).filter(model.id.in_(wanted), model.deleted_at.is_(None))}
+    missing |= {line for line, row, clean in batch if clean[key] not in found}
+  return missing
+
+
+def write_batch(kind, batch, rejects):
+  from app import db, Venue, Artist, Show, recompute_upcoming_counts
+  if kind != 'shows':
+    if batch:
+      copy_rows(models()[kind], list(batch[0][2]), [clean for line, row, clean in batch])
+    db.session.commit()
+    return len(batch)
+
+  missing = missing_references(batch)
+  for line, row, clean in batch:
+    if line in missing:
+      rejects.write(json.dumps({'line': line, 'row': row, 'errors': {'reference': ['unknown venue_id or artist_id']}}) + '\n')
+  batch = [entry for entry in batch if entry[0] not in missing]
+  if batch:
+    columns = list(batch[0][2])
+    inserted = Counter(copy_rows(Show, columns, [clean for line, row, clean in batch], skip_conflicts=True))
+    # whatever didn't come back overlapped a show already booked at that venue or by that artist
+    written = []
+    for line, row, clean in batch:
+      key = tuple(clean[c] for c in columns)
+      if inserted[key]:
+        inserted[key] -= 1
+        written.append((line, row, clean))
+      else:
+        rejects.write(json.dumps({'line': line, 'row': row, 'errors': {'booking': ['overlaps another show at that venue or by that artist']}}) + '\n')
+    batch = written
+  if batch:
+    # COPY skips the per show counter updates, recount the venues and artists it touched
+    now = datetime.utcnow()
+    recompute_upcoming_counts(Venue, Show.venue_id, now, {clean['venue_id'] for line, row, clean in batch})
+    recompute_upcoming_counts(Artist, Show.artist_id, now, {clean['artist_id'] for line, row, clean in batch})
+  db.session.commit()
+  return len(batch)
+
+
+@bulk_cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(FIELDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--checkpoint', type=click.Path(dir_okay=False), help='Defaults to PATH.checkpoint')
+@click.option('--rejects', type=click.Path(dir_okay=False), help='Defaults to PATH.rejects.ndjson')
+def import_command(kind, path, fmt, batch_size, checkpoint, rejects):
+  """Validate and load KIND (venues, artists or shows) from a CSV / NDJSON file."""
+  from app import app, cache, refresh_area_summary
+  fmt = file_format(path, fmt)
+  checkpoint = checkpoint or path + '.checkpoint'
+  rejects_path = rejects or path + '.rejects.ndjson'
+
+  done = 0
+  if os.path.exists(checkpoint):
+    with open(checkpoint) as f:
+      done = json.load(f)['line']
+    click.echo(f'Resuming after line {done} (delete {checkpoint} to start over)')
+
+  def save_checkpoint(line):
+    with open(checkpoint, 'w') as f:
+      json.dump({'line': line}, f)
+
+  loaded = rejected = 0
+  batch = []
+  line = done
+  with open(rejects_path, 'a', encoding='utf-8') as rejects_file:
+    for line, row in enumerate(read_rows(path, fmt), start=1):
+      if line <= done:
+        continue
+      clean, errors = validate(kind, row)
+      if errors:
+        rejected += 1
+        rejects_file.write(json.dumps({'line': line, 'row': row, 'errors': errors}, default=str) + '\n')
+      else:
+        batch.append((line, row, clean))
+      if len(batch) >= batch_size:
+        written = write_batch(kind, batch, rejects_file)
+        rejected += len(batch) - written
+        loaded += written
+        batch = []
+        rejects_file.flush()
+        save_checkpoint(line)
+        click.echo(f'{loaded} rows loaded, {rejected} rejected (line {line})')
+    if batch:
+      written = write_batch(kind, batch, rejects_file)
+      rejected += len(batch) - written
+      loaded += written
+    save_checkpoint(line)
+  if kind != 'artists' and app.config['VENUE_AREAS_FROM_SUMMARY']:
+    refresh_area_summary()
+  cache.clear()
+  click.echo(f'Done: {loaded} rows loaded, {rejected} rejected' + (f' (see {rejects_path})' if rejected else ''))
+
+
+@bulk_cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(FIELDS)))
+@click.argument('path', type=click.Path(dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True)
+def export_command(kind, path, fmt, batch_size):
+  """Stream every KIND row out to a CSV / NDJSON file the import can read back."""
+  from app import db
+  fmt = file_format(path, fmt)
+  model = models()[kind]
+  columns = ['id'] + FIELDS[kind]
+  # server side cursor, rows are fetched and written batch_size at a time
+  query = db.session.query(*(getattr(model, c) for c in columns)).order_by(model.id)
+  if hasattr(model, 'deleted_at'):
+    query = query.filter(model.deleted_at.is_(None))
+  rows = query.execution_options(stream_results=True).yield_per(batch_size)
+  count = 0
+  with open(path, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.writer(f) if fmt == 'csv' else None
+    if writer:
+      writer.writerow(columns)
+    for row in rows:
+      record = dict(zip(columns, row))
+      if 'start_time' in record:
+        record['start_time'] = record['start_time'].isoformat()
+      if writer:
+        if 'genres' in record:
+          record['genres'] = GENRE_SEPARATOR.join(record['genres'] or [])
+        writer.writerow([record[c] for c in columns])
+      else:
+        f.write(json.dumps(record) + '\n')
+      count += 1
+  click.echo(f'Exported {count} {kind} to {path}')
@@ -0,0 +1,170 @@
+#----------------------------------------------------------------------------#
+# Page cache.
+#   Rendered HTML of the read heavy pages, keyed by namespace (e.g. 'venues',
+#   'venue:3') plus the request's path and query string. Write views bump the
+#   namespaces they touch, which orphans exactly those pages; the LRU/TTL ages
+#   the orphans out. With the memory backend a bump only reaches this worker:
+#   pages other workers cached are kept fresh by the ETag in their key (see
+#   app.conditional) or, for pages without one, by a short TTL.
+#----------------------------------------------------------------------------#
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, request, session
+
+
+class MemoryBackend:
+  # bounded in-process LRU with a per entry TTL
+  def __init__(self, max_entries, default_ttl):
+    self.max_entries = max_entries
+    self.default_ttl = default_ttl
+    self.entries = OrderedDict()
+    # namespace versions live outside the LRU, an evicted version would resurrect stale pages
+    self.versions = {}
+    self.lock = threading.Lock()
+    self.hits = self.misses = self.evictions = 0
+
+  def get(self, key):
+    with self.lock:
+      entry = self.entries.get(key)
+      if entry is None or entry[0] < time.monotonic():
+        if entry is not None:
+          del self.entries[key]
+        self.misses += 1
+        return None
+      self.entries.move_to_end(key)
+      self.hits += 1
+      return entry[1]
+
+  def set(self, key, value, ttl=None):
+    expires = time.monotonic() + (ttl or self.default_ttl)
+    with self.lock:
+      self.entries[key] = (expires, value)
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.max_entries:
+        self.entries.popitem(last=False)
+        self.evictions += 1
+
+  def version(self, namespace):
+    return self.versions.get(namespace, 0)
+
+  def bump(self, namespace):
+    with self.lock:
+      self.versions[namespace] = self.versions.get(namespace, 0) + 1
+
+  def clear(self):
+    with self.lock:
+      self.entries.clear()
+      self.versions.clear()
+
+  def stats(self):
+    return {
+      "backend": "memory",
+      "hits": self.hits,
+      "misses": self.misses,
+      "evictions": self.evictions,
+      "entries": len(self.entries),
+      "max_entries": self.max_entries,
+    }
+
+
+class RedisBackend:
+  # shared between workers; needs the optional `redis` package (pip install redis)
+  def __init__(self, url, default_ttl, prefix='fyyur:'):
+    import redis
+    self.client = redis.Redis.from_url(url)
+    self.default_ttl = default_ttl
+    self.prefix = prefix
+    self.hits = self.misses = 0
+
+  def get(self, key):
+    value = self.client.get(self.prefix + key)
+    if value is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    return value.decode('utf-8')
+
+  def set(self, key, value, ttl=None):
+    self.client.set(self.prefix + key, value, ex=ttl or self.default_ttl)
+
+  def version(self, namespace):
+    return int(self.client.get(self.prefix + 'version:' + namespace) or 0)
+
+  def bump(self, namespace):
+    self.client.incr(self.prefix + 'version:' + namespace)
+
+  def clear(self):
+    for key in self.client.scan_iter(self.prefix + '*'):
+      self.client.delete(key)
+
+  def stats(self):
+    # redis does its own eviction (maxmemory-policy), report what it saw
+    info = self.client.info('stats')
+    return {
+      "backend": "redis",
+      "hits": self.hits,
+      "misses": self.misses,
+      "evictions": info.get('evicted_keys', 0),
+      "entries": self.client.dbsize(),
+    }
+
+
+class PageCache:
+  def __init__(self, app=None):
+    self.backend = None
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    backend = app.config.get('CACHE_BACKEND', 'memory')
+    ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+    if backend == 'redis':
+      self.backend = RedisBackend(app.config['CACHE_REDIS_URL'], ttl)
+    elif backend == 'memory':
+      self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 1024), ttl)
+    else:
+      # 'null' / None switches page caching off
+      self.backend = None
+
+  def cached(self, namespace, ttl=None, mimetype=None):
+    # caches a view's rendered HTML. `namespace` is formatted with the view's
+    # arguments, e.g. @cache.cached('venue:{venue_id}'). Views returning some
+    # other text (JSON) pass its mimetype. `ttl` may be a function of the view's
+    # arguments, for pages whose lifetime depends on the request
+    def respond(page):
+      return Response(page, mimetype=mimetype) if mimetype and isinstance(page, str) else page
+
+    def decorator(view):
+      @wraps(view)
+      def wrapper(*args, **kwargs):
+        # pages carrying a flash message are one-offs, render those fresh
+        if self.backend is None or request.method != 'GET' or '_flashes' in session:
+          return respond(view(*args, **kwargs))
+        ns = namespace.format(**kwargs)
+        # under @conditional the page's ETag is part of the key: data changed anywhere, new key
+        key = f'{ns}:{self.backend.version(ns)}:{g.get("page_etag", "")}:{request.full_path}'
+        page = self.backend.get(key)
+        if page is not None:
+          return respond(page)
+        page = view(*args, **kwargs)
+        if isinstance(page, str):
+          self.backend.set(key, page, ttl(**kwargs) if callable(ttl) else ttl)
+        return respond(page)
+      return wrapper
+    return decorator
+
+  def invalidate(self, *namespaces):
+    if self.backend is not None:
+      for ns in set(namespaces):
+        self.backend.bump(ns)
+
+  def clear(self):
+    if self.backend is not None:
+      self.backend.clear()
+
+  def stats(self):
+    return self.backend.stats() if self.backend is not None else {"backend": None}
@@ -13,6 +13,15 @@ def test():
         abort("Aborted at user request.")
 
 
+def bench():
+    # route benchmark against the saved baseline. Not part of prepare / deploy: it writes
+    # rows, so bench.py only runs against BENCH_DATABASE_URL (a scratch database)
+    with settings(warn_only=True):
+        result = local("python bench.py routes --compare bench_baseline.json", capture=True)
+    if result.failed and not confirm("Benchmark failed or regressed. Continue?"):
+        abort("Aborted at user request.")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
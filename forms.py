@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, URL, ValidationError
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
+from wtforms.validators import DataRequired, URL, ValidationError, NumberRange
 import re
 
 # ENUM for clean coding
@@ -12,9 +12,12 @@ class Genre:
         'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk',
         'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other'
     ]
+    allowed = frozenset(values)
+    _choices = tuple((v, v) for v in values)
+
     @classmethod
     def choices(cls):
-        return [(v, v) for v in cls.values]
+        return cls._choices
 
 class State:
     values = [
@@ -23,43 +26,73 @@ class State:
         'ND', 'OH', 'OK', 'OR', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'PA', 'RI', 'SC', 'SD',
         'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
     ]
+    allowed = frozenset(values)
+    _choices = tuple((v, v) for v in values)
+
     @classmethod
     def choices(cls):
-        return [(v, v) for v in cls.values]
+        return cls._choices
 
 # custom validators
 ########################
+PHONE_PATTERN = re.compile(r'^\d{3}-\d{3}-\d{4}$')
+FACEBOOK_PREFIX = "https://www.facebook.com/"
+URL_CHECK = URL()
+
+# the checks take plain values, so the form-free validation below shares them
+def check_genres(genres):
+    for genre in genres:
+        if genre not in Genre.allowed:
+            raise ValidationError(f"'{genre}' is not a valid genre.")
+
+def check_state(state):
+    if state not in State.allowed:
+        raise ValidationError(f"'{state}' is not a valid US state abbreviation.")
+
+def check_phone(phone):
+    if phone and not PHONE_PATTERN.match(phone):
+        raise ValidationError('Invalid phone number. Format must be XXX-XXX-XXXX.')
+
+def check_facebook_url(url):
+    # what URL() + facebook_url_validator accept on the forms
+    match = URL_CHECK.regex.match(url or '')
+    if not match or not URL_CHECK.validate_hostname(match.group('host')):
+        raise ValidationError('Invalid URL.')
+    if not url.startswith(FACEBOOK_PREFIX):
+        raise ValidationError(f'Facebook link must start with "{FACEBOOK_PREFIX}".')
+
 def genre_enum_validator(form, field):
     # DONETODO implement enum restriction
-    for genre in field.data:
-        if genre not in Genre.values:
-            raise ValidationError(f"'{genre}' is not a valid genre.")
+    check_genres(field.data)
 
 def state_enum_validator(form, field):
     # DONETODO implement validation logic for state
-    if field.data not in State.values:
-        raise ValidationError(f"'{field.data}' is not a valid US state abbreviation.")
+    check_state(field.data)
 
 def phone_validator(form, field):
     # DONETODO implement validation logic for state
-    phone_pattern = r'^\d{3}-\d{3}-\d{4}$'
-    if field.data and not re.match(phone_pattern, field.data):
-        raise ValidationError('Invalid phone number. Format must be XXX-XXX-XXXX.')
+    check_phone(field.data)
 
 def facebook_url_validator(form, field):
-    if field.data and not field.data.startswith("https://www.facebook.com/"):
-        raise ValidationError('Facebook link must start with "https://www.facebook.com/".')
+    if field.data and not field.data.startswith(FACEBOOK_PREFIX):
+        raise ValidationError(f'Facebook link must start with "{FACEBOOK_PREFIX}".')
 
 # Forms
 #########################
 class ShowForm(FlaskForm):
-    artist_id = StringField('artist_id')
-    venue_id = StringField('venue_id')
+    artist_id = IntegerField('artist_id', validators=[DataRequired(), NumberRange(min=1)])
+    venue_id = IntegerField('venue_id', validators=[DataRequired(), NumberRange(min=1)])
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
         default=datetime.today()
     )
+    # minutes, the show blocks the venue and the artist for this long
+    duration = IntegerField(
+        'duration',
+        validators=[DataRequired(), NumberRange(min=15, max=24 * 60)],
+        default=120
+    )
 
 class VenueForm(FlaskForm):
     name = StringField('name', validators=[DataRequired()])
@@ -114,3 +147,101 @@ class ArtistForm(FlaskForm):
     seeking_venue = BooleanField('seeking_venue')
     seeking_description = StringField('seeking_description')
 
+
+# Form-free validation
+#########################
+# The same rules as the forms above for plain dicts (bulk imports, JSON payloads), without
+# building a WTForms form per row. Each returns (clean values, None) or (None, errors),
+# errors being {field: [messages]} like form.errors. One difference: start_time may also be
+# ISO 8601 with an offset (partner feeds), which ShowForm rejects; it's converted to UTC.
+REQUIRED = 'This field is required.'
+TRUTHY = frozenset(('1', 'true', 'yes', 'y', 'on'))
+
+def parse_utc(value):
+    # an ISO 8601 date / datetime (or a datetime) as naive UTC, the way show times are stored:
+    # "2027-03-01T18:00:00+02:00" is 16:00. Without an offset it's taken to be UTC already
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(re.sub(r'Z$', '+00:00', str(value)))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def _text(value):
+    # missing and blank values come out as None, like an empty form field
+    if value is None:
+        return None
+    value = str(value)
+    return value if value.strip() else None
+
+def _flag(value):
+    return value if isinstance(value, bool) else str(value).lower() in TRUTHY
+
+def _integer(value, errors, field, low, high=None):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        errors[field] = ['Not a valid integer value.']
+        return None
+    if number < low or (high is not None and number > high):
+        errors[field] = [f'Number must be at least {low}.' if high is None else f'Number must be between {low} and {high}.']
+    return number
+
+def _profile(data, fields, seeking):
+    errors = {}
+    clean = {field: _text(data.get(field)) for field in fields if field not in ('genres', seeking)}
+    for field in ('name', 'city', 'state', 'address'):
+        if field in clean and not clean[field]:
+            errors[field] = [REQUIRED]
+    genres = data.get('genres') or []
+    clean['genres'] = [genres] if isinstance(genres, str) else list(genres)
+    clean[seeking] = _flag(data.get(seeking) or False)
+    checks = [('phone', check_phone, clean['phone']), ('facebook_link', check_facebook_url, clean['facebook_link'])]
+    if clean['state']:
+        checks.append(('state', check_state, clean['state']))
+    if clean['genres']:
+        checks.append(('genres', check_genres, clean['genres']))
+    else:
+        errors['genres'] = [REQUIRED]
+    for field, check, value in checks:
+        try:
+            check(value)
+        except ValidationError as e:
+            errors[field] = [str(e)]
+    if errors:
+        return None, errors
+    clean['seeking_description'] = clean['seeking_description'] or ''
+    # same key order as `fields`, the bulk import COPYs them in that order
+    return {field: clean[field] for field in fields}, None
+
+VENUE_FIELDS = ('name', 'city', 'state', 'address', 'phone', 'image_link', 'facebook_link',
+                'website_link', 'seeking_talent', 'seeking_description', 'genres')
+ARTIST_FIELDS = ('name', 'city', 'state', 'phone', 'image_link', 'facebook_link',
+                 'website_link', 'seeking_venue', 'seeking_description', 'genres')
+
+def validate_venue(data):
+    return _profile(data, VENUE_FIELDS, 'seeking_talent')
+
+def validate_artist(data):
+    return _profile(data, ARTIST_FIELDS, 'seeking_venue')
+
+def validate_show(data):
+    errors = {}
+    clean = {}
+    for field in ('venue_id', 'artist_id'):
+        if data.get(field) in (None, ''):
+            errors[field] = [REQUIRED]
+        else:
+            clean[field] = _integer(data[field], errors, field, 1)
+    start_time = data.get('start_time')
+    if not start_time:
+        errors['start_time'] = [REQUIRED]
+    else:
+        try:
+            # "2027-03-01 18:00:00" from the form, or ISO 8601 (Z / +hh:mm) from JSON
+            clean['start_time'] = parse_utc(start_time)
+        except ValueError:
+            errors['start_time'] = ['Not a valid datetime value.']
+    duration = data.get('duration')
+    clean['duration'] = 120 if duration in (None, '') else _integer(duration, errors, 'duration', 15, 24 * 60)
+    if errors:
+        return None, errors
+    return clean, None
@@ -0,0 +1,30 @@
+#----------------------------------------------------------------------------#
+# Production server (gunicorn reads this file from the working directory).
+#   gunicorn app:app
+# The app is sync (SQLAlchemy 1.3 / psycopg2, no async driver), so concurrent
+# requests are served by threaded workers: each of WEB_CONCURRENCY processes
+# runs GUNICORN_THREADS requests at a time. A slow client or query only holds
+# one thread. Every thread that is in a request holds a pool connection, and
+# /api/v1/search borrows up to API_THREAD_POOL_WORKERS more (config.py), so
+# per worker keep
+#   GUNICORN_THREADS + API_THREAD_POOL_WORKERS <= DB_POOL_SIZE + DB_MAX_OVERFLOW
+# and WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under Postgres max_connections.
+# SECRET_KEY must be set, see below.
+#----------------------------------------------------------------------------#
+
+import os
+
+# the session cookie (flash messages, read-your-writes) is signed with SECRET_KEY: every
+# worker, and every worker max_requests restarts, has to sign and check it with the same one
+if not os.environ.get('SECRET_KEY'):
+  raise RuntimeError('set SECRET_KEY (the same value for every worker) before starting gunicorn')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# Heroku sets WEB_CONCURRENCY from the dyno size
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 6))
+timeout = 30
+# restart workers now and then, the page cache and suggestion index are per process anyway
+max_requests = 5000
+max_requests_jitter = 500
@@ -0,0 +1,120 @@
+#----------------------------------------------------------------------------#
+# Request instrumentation (INSTRUMENTATION_ENABLED in config.py).
+#   Per request: wall time, SQL statement count, SQL time and template render
+#   time, written as one JSON log line and a Server-Timing header. Per
+#   endpoint latency histograms are served in Prometheus format at /metrics.
+#----------------------------------------------------------------------------#
+
+import json
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_app_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class TimedTemplate(Template):
+  # jinja template class that adds its render time to the current request
+  def render(self, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+      return super().render(*args, **kwargs)
+    finally:
+      if has_app_context() and 'timings' in g:
+        g.timings['template_ms'] += (time.perf_counter() - start) * 1000
+
+
+class Instrumentation:
+  def __init__(self, app=None):
+    self.lock = threading.Lock()
+    self.buckets = DEFAULT_BUCKETS
+    # endpoint -> [bucket counts..., sum, count]
+    self.latency = defaultdict(lambda: [0] * (len(self.buckets) + 2))
+    self.sql_statements = defaultdict(int)
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    if not app.config.get('INSTRUMENTATION_ENABLED'):
+      return
+    self.buckets = tuple(app.config.get('INSTRUMENTATION_BUCKETS', DEFAULT_BUCKETS))
+    # on the Engine class so every engine (and every pool connection) is covered
+    event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+    app.jinja_env.template_class = TimedTemplate
+    app.before_request(self.before_request)
+    app.after_request(self.after_request)
+    app.add_url_rule('/metrics', 'metrics', self.metrics)
+    self.logger = app.logger
+
+  def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+  def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    elapsed = (time.perf_counter() - conn.info['query_start'].pop()) * 1000
+    if has_app_context() and 'timings' in g:
+      g.timings['sql_count'] += 1
+      g.timings['sql_ms'] += elapsed
+
+  def before_request(self):
+    g.timings = {'start': time.perf_counter(), 'sql_count': 0, 'sql_ms': 0.0, 'template_ms': 0.0}
+
+  def after_request(self, response):
+    timings = g.pop('timings', None)
+    if timings is None:
+      return response
+    total_ms = (time.perf_counter() - timings['start']) * 1000
+    endpoint = request.endpoint or 'unknown'
+    response.headers['Server-Timing'] = ', '.join([
+      f"db;dur={timings['sql_ms']:.2f};desc=\"{timings['sql_count']} queries\"",
+      f"tpl;dur={timings['template_ms']:.2f}",
+      f"total;dur={total_ms:.2f}",
+    ])
+    self.logger.info(json.dumps({
+      'event': 'request',
+      'method': request.method,
+      'path': request.path,
+      'endpoint': endpoint,
+      'status': response.status_code,
+      'total_ms': round(total_ms, 2),
+      'sql_count': timings['sql_count'],
+      'sql_ms': round(timings['sql_ms'], 2),
+      'template_ms': round(timings['template_ms'], 2),
+    }))
+    self.observe(endpoint, total_ms / 1000, timings['sql_count'])
+    return response
+
+  def observe(self, endpoint, seconds, sql_count):
+    with self.lock:
+      series = self.latency[endpoint]
+      for i, bound in enumerate(self.buckets):
+        if seconds <= bound:
+          series[i] += 1
+      series[-2] += seconds
+      series[-1] += 1
+      self.sql_statements[endpoint] += sql_count
+
+  def metrics(self):
+    lines = [
+      '# HELP fyyur_request_duration_seconds Request wall time by endpoint.',
+      '# TYPE fyyur_request_duration_seconds histogram',
+    ]
+    with self.lock:
+      for endpoint, series in sorted(self.latency.items()):
+        for bound, count in zip(self.buckets, series):
+          lines.append(f'fyyur_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+        lines.append(f'fyyur_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {series[-1]}')
+        lines.append(f'fyyur_request_duration_seconds_sum{{endpoint="{endpoint}"}} {series[-2]:.6f}')
+        lines.append(f'fyyur_request_duration_seconds_count{{endpoint="{endpoint}"}} {series[-1]}')
+      lines += [
+        '# HELP fyyur_sql_statements_total SQL statements issued by endpoint.',
+        '# TYPE fyyur_sql_statements_total counter',
+      ]
+      for endpoint, count in sorted(self.sql_statements.items()):
+        lines.append(f'fyyur_sql_statements_total{{endpoint="{endpoint}"}} {count}')
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,38 @@
+"""venue area summary view
+
+Revision ID: d0f83f3446b1
+Revises: fbf43368a903
+Create Date: 2026-10-18 17:41:12.402211
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0f83f3446b1'
+down_revision = 'fbf43368a903'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # one row per (city, state) with the area's venues, read by the /venues page
+    op.execute('''
+        CREATE MATERIALIZED VIEW venue_area_summary AS
+        SELECT city,
+               state,
+               count(*)::integer AS num_venues,
+               sum(num_upcoming_shows)::integer AS num_upcoming_shows,
+               jsonb_agg(jsonb_build_object(
+                 'id', id, 'name', name, 'num_upcoming_shows', num_upcoming_shows
+               ) ORDER BY id) AS venues
+        FROM "Venue"
+        GROUP BY city, state
+    ''')
+    # serves the (city, state) keyset pages, and REFRESH ... CONCURRENTLY needs a unique index
+    op.create_index('ix_venue_area_summary_city_state', 'venue_area_summary', ['city', 'state'], unique=True)
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW venue_area_summary')
@@ -0,0 +1,68 @@
+#----------------------------------------------------------------------------#
+# Read replicas (DATABASE_REPLICA_URLS in config.py).
+#   Views marked @replicas.read_only run their queries on one of the replica
+#   binds, picked round robin per request. Everything else stays on the
+#   primary, and so does every request from a client that wrote something in
+#   the last READ_YOUR_WRITES_SECONDS (so the redirect after a create / edit
+#   shows the new data even if the replicas lag behind).
+#----------------------------------------------------------------------------#
+
+import itertools
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_app_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import orm
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingSession(SignallingSession):
+  def get_bind(self, mapper=None, clause=None):
+    replica = g.get('db_replica') if has_app_context() else None
+    # flushes are writes, those always go to the primary
+    if replica is not None and not self._flushing:
+      return get_state(self.app).db.get_engine(self.app, bind=replica)
+    return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+  def create_session(self, options):
+    return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class ReplicaRouter:
+  def __init__(self, app=None):
+    self.replicas = []
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    self.replicas = list(app.config.get('DB_REPLICAS', []))
+    self.sticky_seconds = app.config.get('READ_YOUR_WRITES_SECONDS', 10)
+    self.cycle = itertools.cycle(self.replicas)
+    self.lock = threading.Lock()
+    if self.replicas:
+      app.after_request(self.after_request)
+
+  def next_replica(self):
+    with self.lock:
+      return next(self.cycle)
+
+  def read_only(self, view):
+    # the view only reads, so its queries may run on a replica
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      g.db_read_only = True
+      if self.replicas and session.get('primary_until', 0) < time.time():
+        g.db_replica = self.next_replica()
+      return view(*args, **kwargs)
+    return wrapper
+
+  def after_request(self, response):
+    # read your writes: after a successful write this client reads from the primary for a while
+    if request.method not in SAFE_METHODS and not g.get('db_read_only') and response.status_code < 400:
+      session['primary_until'] = time.time() + self.sticky_seconds
+    return response
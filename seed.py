@@ -0,0 +1,130 @@
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#   flask seed --venues 10000 --artists 10000 --shows 100000
+# Fills Venue / Artist / Show with made up but realistic looking rows (genres
+# from forms.Genre, states from forms.State) using COPY, for load tests and
+# benchmarks. Adds to whatever is already there.
+#----------------------------------------------------------------------------#
+
+import random
+from datetime import datetime, timedelta
+
+import click
+
+from forms import Genre, State
+from bulk import copy_rows
+
+ADJECTIVES = ['Velvet', 'Golden', 'Electric', 'Midnight', 'Crimson', 'Silver', 'Wild', 'Blue',
+              'Rusty', 'Neon', 'Hidden', 'Lucky', 'Broken', 'Little', 'Grand', 'Howling']
+NOUNS = ['Room', 'Hall', 'Lounge', 'Garden', 'Tavern', 'Theatre', 'Cellar', 'Warehouse',
+         'Saloon', 'Barn', 'Ballroom', 'Club', 'Stage', 'Parlor']
+BANDS = ['Band', 'Trio', 'Collective', 'Orchestra', 'Quartet', 'Brothers', 'Sisters', 'Project',
+         'Ensemble', 'Kids', 'Machine', 'Revival']
+FIRST_NAMES = ['Matt', 'Ana', 'Jules', 'Sam', 'Priya', 'Kofi', 'Lena', 'Diego', 'Mei', 'Olu']
+LAST_NAMES = ['Quevado', 'Petals', 'Rivers', 'Stone', 'Okafor', 'Nakamura', 'Silva', 'Kowalski']
+# town names that exist in most states
+CITIES = ['Springfield', 'Franklin', 'Greenville', 'Clinton', 'Madison', 'Salem', 'Fairview',
+          'Georgetown', 'Arlington', 'Ashland', 'Bristol', 'Dover', 'Jackson', 'Oxford']
+
+
+def genres(rnd):
+  return rnd.sample(Genre.values, rnd.randint(1, 3))
+
+
+def phone(rnd):
+  return f'{rnd.randint(200, 999)}-{rnd.randint(200, 999)}-{rnd.randint(1000, 9999)}'
+
+
+def venue_row(rnd):
+  name = f'The {rnd.choice(ADJECTIVES)} {rnd.choice(NOUNS)}'
+  seeking = rnd.random() < 0.3
+  return {
+    'name': name,
+    'city': rnd.choice(CITIES),
+    'state': rnd.choice(State.values),
+    'address': f'{rnd.randint(1, 9999)} {rnd.choice(LAST_NAMES)} St',
+    'phone': phone(rnd),
+    'image_link': f'https://picsum.photos/seed/venue{rnd.randint(1, 10 ** 6)}/400',
+    'facebook_link': 'https://www.facebook.com/' + name.replace(' ', '').lower(),
+    'website_link': 'https://' + name.replace(' ', '').lower() + '.com',
+    'seeking_talent': seeking,
+    'seeking_description': 'Looking for local acts to play on weekends.' if seeking else '',
+    'genres': genres(rnd),
+  }
+
+
+def artist_row(rnd):
+  if rnd.random() < 0.5:
+    name = f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}'
+  else:
+    name = f'The {rnd.choice(ADJECTIVES)} {rnd.choice(BANDS)}'
+  seeking = rnd.random() < 0.3
+  return {
+    'name': name,
+    'city': rnd.choice(CITIES),
+    'state': rnd.choice(State.values),
+    'phone': phone(rnd),
+    'image_link': f'https://picsum.photos/seed/artist{rnd.randint(1, 10 ** 6)}/400',
+    'facebook_link': 'https://www.facebook.com/' + name.replace(' ', '').lower(),
+    'website_link': '',
+    'seeking_venue': seeking,
+    'seeking_description': 'Looking for shows to perform at in the area.' if seeking else '',
+    'genres': genres(rnd),
+  }
+
+
+def seed(venues, artists, shows, batch_size=10000, rnd=None):
+  # appends the rows in COPY batches and returns the number of rows written per table
+  from app import db, Venue, Artist, Show, recompute_upcoming_counts
+  rnd = rnd or random.Random()
+  for model, count, make in ((Venue, venues, venue_row), (Artist, artists, artist_row)):
+    for start in range(0, count, batch_size):
+      rows = [make(rnd) for _ in range(min(batch_size, count - start))]
+      copy_rows(model, list(rows[0]), rows)
+      db.session.commit()
+
+  if shows:
+    venue_min, venue_max = db.session.query(db.func.min(Venue.id), db.func.max(Venue.id)).one()
+    artist_min, artist_max = db.session.query(db.func.min(Artist.id), db.func.max(Artist.id)).one()
+    if venue_min is None or artist_min is None:
+      raise click.ClickException('shows need at least one venue and one artist')
+    evening = datetime.utcnow().replace(hour=18, minute=0, second=0, microsecond=0)
+    written = 0
+    for start in range(0, shows, batch_size):
+      rows = [{
+        'venue_id': rnd.randint(venue_min, venue_max),
+        'artist_id': rnd.randint(artist_min, artist_max),
+        # two hour shows in the evening slots, +/- a year from now
+        'start_time': evening + timedelta(days=rnd.randint(-365, 365), hours=rnd.choice((0, 2, 4))),
+        'duration': 120,
+      } for _ in range(min(batch_size, shows - start))]
+      # random picks double book now and then, those are skipped
+      written += len(copy_rows(Show, ['venue_id', 'artist_id', 'start_time', 'duration'], rows, skip_conflicts=True))
+      db.session.commit()
+    shows = written
+    # COPY skips the counter maintenance, recount once at the end
+    now = datetime.utcnow()
+    recompute_upcoming_counts(Venue, Show.venue_id, now)
+    recompute_upcoming_counts(Artist, Show.artist_id, now)
+    db.session.commit()
+
+  for model in (Venue, Artist, Show):
+    db.session.execute(db.text(f'ANALYZE "{model.__tablename__}"'))
+  db.session.commit()
+  return {'venues': venues, 'artists': artists, 'shows': shows}
+
+
+@click.command('seed')
+@click.option('--venues', default=1000, show_default=True)
+@click.option('--artists', default=1000, show_default=True)
+@click.option('--shows', default=10000, show_default=True)
+@click.option('--batch-size', default=10000, show_default=True)
+@click.option('--random-seed', type=int, help='Make the generated data reproducible.')
+def seed_command(venues, artists, shows, batch_size, random_seed):
+  """Add synthetic venues, artists and shows (only on a scratch database!)."""
+  from app import app, cache, refresh_area_summary
+  written = seed(venues, artists, shows, batch_size, random.Random(random_seed))
+  if app.config['VENUE_AREAS_FROM_SUMMARY']:
+    refresh_area_summary()
+  cache.clear()
+  click.echo(', '.join(f'{count} {kind}' for kind, count in written.items()) + ' added')
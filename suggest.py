@@ -0,0 +1,132 @@
+#----------------------------------------------------------------------------#
+# Typeahead suggestions.
+#   An in-memory sorted prefix index of venue and artist names, so as-you-type
+#   lookups are a bisect into a list instead of an ilike query. Names are
+#   indexed from every word ("the musical hop", "musical hop", "hop") so
+#   "hop" finds "The Musical Hop". Rebuilt from the database on a background
+#   thread when the worker starts and every SUGGEST_REFRESH_SECONDS after (that
+#   picks up writes made by other workers and bulk imports, see app.py); this
+#   worker's own writes update it in place, and the ones made while a rebuild
+#   scans are replayed onto the new index.
+#----------------------------------------------------------------------------#
+
+import bisect
+import threading
+import time
+import unicodedata
+
+KINDS = ('venues', 'artists')
+
+
+def normalize(name):
+  # case, accents and spacing don't matter when typing: "Café  Rouge" -> "cafe rouge"
+  name = unicodedata.normalize('NFKD', name or '')
+  name = ''.join(c for c in name if not unicodedata.combining(c))
+  return ' '.join(name.casefold().split())
+
+
+def word_keys(name):
+  words = normalize(name).split()
+  return {' '.join(words[i:]) for i in range(len(words))}
+
+
+class SuggestionIndex:
+  def __init__(self):
+    # kind -> sorted [(key, id)], and (kind, id) -> display name
+    self.keys = {kind: [] for kind in KINDS}
+    self.names = {}
+    self.lock = threading.Lock()
+    self.built_at = None
+    # the add / remove calls made since start_build, None when no rebuild is running
+    self.pending = None
+
+  def start_build(self):
+    # True for exactly one rebuild at a time. Call it before the scans: from here on
+    # writes are journaled, so whatever the scans miss is replayed by build()
+    with self.lock:
+      if self.pending is not None:
+        return False
+      self.pending = []
+      return True
+
+  def release(self):
+    # ends a start_build, built or not; call it in a finally so a failed rebuild
+    # (Postgres down mid-scan) doesn't block every later one
+    with self.lock:
+      self.pending = None
+
+  def build(self, rows):
+    # rows: (kind, id, name) for every venue and artist
+    keys = {kind: [] for kind in KINDS}
+    names = {}
+    for kind, entity_id, name in rows:
+      names[(kind, entity_id)] = name
+      keys[kind].extend((key, entity_id) for key in word_keys(name))
+    for entries in keys.values():
+      entries.sort()
+    with self.lock:
+      self.keys, self.names, self.built_at = keys, names, time.monotonic()
+      # the rows may predate a write made during the scan (a venue deleted after it was
+      # read): replay them. Both are idempotent, replaying one the rows already had is harmless
+      for op, args in self.pending or ():
+        op(*args)
+
+  def add(self, kind, entity_id, name):
+    # also used for renames
+    with self.lock:
+      self._add(kind, entity_id, name)
+      if self.pending is not None:
+        self.pending.append((self._add, (kind, entity_id, name)))
+
+  def remove(self, kind, entity_id):
+    with self.lock:
+      self._remove(kind, entity_id)
+      if self.pending is not None:
+        self.pending.append((self._remove, (kind, entity_id)))
+
+  def _add(self, kind, entity_id, name):
+    self._remove(kind, entity_id)
+    self.names[(kind, entity_id)] = name
+    for key in word_keys(name):
+      bisect.insort(self.keys[kind], (key, entity_id))
+
+  def _remove(self, kind, entity_id):
+    name = self.names.pop((kind, entity_id), None)
+    if name is None:
+      return
+    entries = self.keys[kind]
+    for key in word_keys(name):
+      i = bisect.bisect_left(entries, (key, entity_id))
+      if i < len(entries) and entries[i] == (key, entity_id):
+        del entries[i]
+
+  def lookup(self, prefix, kinds=KINDS, limit=10):
+    # up to `limit` {type, id, name} whose name has a word starting with `prefix`,
+    # names that start with it first
+    prefix = normalize(prefix)
+    if not prefix:
+      return []
+    matches = []
+    with self.lock:
+      for kind in kinds:
+        entries = self.keys[kind]
+        seen = set()
+        i = bisect.bisect_left(entries, (prefix,))
+        while i < len(entries) and len(seen) < limit:
+          key, entity_id = entries[i]
+          if not key.startswith(prefix):
+            break
+          i += 1
+          if entity_id not in seen:
+            seen.add(entity_id)
+            name = self.names[(kind, entity_id)]
+            matches.append((not normalize(name).startswith(prefix), key, kind, entity_id, name))
+    matches.sort()
+    return [{"type": kind, "id": entity_id, "name": name} for _, _, kind, entity_id, name in matches[:limit]]
+
+  def stats(self):
+    return {
+      "entries": len(self.names),
+      "keys": sum(len(entries) for entries in self.keys.values()),
+      "age_seconds": round(time.monotonic() - self.built_at, 1) if self.built_at is not None else None,
+    }
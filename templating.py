@@ -0,0 +1,133 @@
+#----------------------------------------------------------------------------#
+# Templates.
+#   TEMPLATE_BYTECODE_CACHE_DIR (config.py) keeps compiled templates on disk;
+#   `flask templates compile` fills it at deploy time, so new workers load
+#   bytecode instead of lexing / parsing / compiling every template on its
+#   first request. Jinja checks each entry against the template source, an
+#   edited template is simply compiled again.
+#
+#   With TEMPLATE_PROFILING=1 in debug mode every template and every {% block %}
+#   is timed: a JSON log line per request and running totals at
+#   /debug/templates (?reset=1 starts over). Times are inclusive: a layout
+#   includes the blocks it renders, a child template its layout. Pages
+#   served from the page cache don't render, so they don't show up.
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+import click
+from flask import g, has_app_context, jsonify, request
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache
+
+from instrumentation import TimedTemplate
+
+
+def enable_bytecode_cache(app):
+  directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+  if directory:
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+class ProfiledTemplate(TimedTemplate):
+  # wraps the compiled root and block render functions of every template it loads
+  profiler = None
+
+  @classmethod
+  def _from_namespace(cls, environment, namespace, globals):
+    template = super()._from_namespace(environment, namespace, globals)
+    name = template.name or '<string>'
+    template.root_render_func = timed(('template', name), template.root_render_func)
+    template.blocks = {block: timed(('block', f'{name}:{block}'), render)
+                       for block, render in template.blocks.items()}
+    return template
+
+
+def timed(key, render):
+  # render functions are generators: the time runs from the first chunk until exhausted
+  def wrapper(context, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+      yield from render(context, *args, **kwargs)
+    finally:
+      if ProfiledTemplate.profiler is not None:
+        ProfiledTemplate.profiler.record(key, (time.perf_counter() - start) * 1000)
+  return wrapper
+
+
+class TemplateProfiler:
+  def __init__(self, app=None):
+    self.lock = threading.Lock()
+    # (kind, name) -> [renders, total ms, max ms]
+    self.totals = defaultdict(lambda: [0, 0.0, 0.0])
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    if not (app.debug and app.config.get('TEMPLATE_PROFILING', False)):
+      return
+    ProfiledTemplate.profiler = self
+    app.jinja_env.template_class = ProfiledTemplate
+    app.after_request(self.after_request)
+    app.add_url_rule('/debug/templates', 'template_profile', self.report)
+    self.logger = app.logger
+
+  def record(self, key, ms):
+    with self.lock:
+      entry = self.totals[key]
+      entry[0] += 1
+      entry[1] += ms
+      entry[2] = max(entry[2], ms)
+    if has_app_context():
+      renders = g.setdefault('template_profile', {})
+      renders[key] = renders.get(key, 0.0) + ms
+
+  def after_request(self, response):
+    renders = g.pop('template_profile', None)
+    if renders:
+      self.logger.debug(json.dumps({
+        'event': 'template_profile',
+        'path': request.path,
+        'templates': {name: round(ms, 2) for (kind, name), ms in renders.items() if kind == 'template'},
+        'blocks': {name: round(ms, 2) for (kind, name), ms in renders.items() if kind == 'block'},
+      }))
+    return response
+
+  def report(self):
+    if request.args.get('reset'):
+      with self.lock:
+        self.totals.clear()
+    with self.lock:
+      rows = sorted(self.totals.items(), key=lambda item: -item[1][1])
+    report = {'templates': [], 'blocks': []}
+    for (kind, name), (renders, total_ms, max_ms) in rows:
+      report[kind + 's'].append({
+        'name': name,
+        'renders': renders,
+        'total_ms': round(total_ms, 2),
+        'mean_ms': round(total_ms / renders, 3),
+        'max_ms': round(max_ms, 2),
+      })
+    return jsonify(report)
+
+
+templates_cli = AppGroup('templates', help='Template bytecode cache.')
+
+
+@templates_cli.command('compile')
+def compile_command():
+  """Compile every template under templates/ into TEMPLATE_BYTECODE_CACHE_DIR."""
+  from app import app
+  env = app.jinja_env
+  if env.bytecode_cache is None:
+    raise click.ClickException('set TEMPLATE_BYTECODE_CACHE_DIR first')
+  names = env.list_templates()
+  for name in names:
+    # loading a template through the environment writes its bytecode cache entry
+    env.get_template(name)
+  click.echo(f'{len(names)} templates compiled into {app.config["TEMPLATE_BYTECODE_CACHE_DIR"]}')